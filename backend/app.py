@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
@@ -8,16 +9,29 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from routers.auth import router as auth_router
 from routers.jobs import router as jobs_router
+from routers.metrics import router as metrics_router
+from routers.pool import start_pool, stop_pool
+from routers.events import bridge
 
 # Decide by an env var—set DEV=1 in your shell when local‐deving.
 DEV = True
 BASE_DIR = Path(__file__).parent
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # warm workers live as long as the app; size via TGT_WORKERS
+    start_pool().on_event = bridge.notify
+    yield
+    stop_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Always include your API routers:
 app.include_router(auth_router)
 app.include_router(jobs_router, prefix="/jobs")
+app.include_router(metrics_router)
 
 if DEV:
     # In dev, allow your React app (on :8080) to call your backend (on :8000)
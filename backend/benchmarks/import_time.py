@@ -0,0 +1,85 @@
+"""
+Where import time goes, with a budget to keep the API and workers light.
+
+Each module is imported in a fresh interpreter under `python -X importtime`.
+The report lists its total import time and the top-level packages that cost
+the most (self time summed over all their submodules). The run fails (exit 1)
+when a module exceeds --budget seconds or pulls in one of the HEAVY ML
+packages, which must only load once a job needs them (see inference.actions):
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time app routers.workers --budget 1.0 --top 15
+    python -m benchmarks.import_time inference.api_interface.gloss --allow-heavy --budget 0
+"""
+
+import sys
+import argparse
+import subprocess
+from collections import defaultdict
+
+# what `import app` and a freshly spawned worker should never import
+DEFAULT_MODULES = ["app", "routers.workers"]
+HEAVY = ("torch", "transformers", "whisper", "whisperx", "pyannote", "spacy", "stanza", "deepl", "sudachipy")
+
+
+def import_times(module: str) -> list[tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for everything importing `module` loads."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def report(module: str, top: int) -> tuple[float, list[str]]:
+    rows = import_times(module)
+    by_package = defaultdict(lambda: [0, 0])
+    for name, self_us, _ in rows:
+        package = by_package[name.split(".")[0]]
+        package[0] += self_us
+        package[1] += 1
+    total = sum(self_us for _, self_us, _ in rows) / 1e6
+    heavy = sorted(p for p in by_package if p in HEAVY)
+
+    print(f"\nimport {module}: {total:.3f}s, {len(rows)} modules")
+    print(f"{'package':<28}{'seconds':>10}{'modules':>10}{'share':>8}")
+    for package, (self_us, count) in sorted(by_package.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"{package:<28}{self_us / 1e6:>10.3f}{count:>10}{self_us / 1e6 / total:>8.0%}")
+    return total, heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report and budget import time")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per module; 0 disables the check")
+    parser.add_argument("--top", type=int, default=10, help="packages listed per module")
+    parser.add_argument("--allow-heavy", action="store_true", help="do not fail on HEAVY packages")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module in args.modules:
+        try:
+            total, heavy = report(module, args.top)
+        except RuntimeError as e:
+            failures.append(str(e))
+            continue
+        if args.budget and total > args.budget:
+            failures.append(f"import {module} took {total:.3f}s, budget {args.budget:.3f}s")
+        if heavy and not args.allow_heavy:
+            failures.append(f"import {module} loads {', '.join(heavy)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Parity report for the Japanese romanization engines.
+
+Runs the transformer engine (JapaneseStrategy, ja_core_news_trf readings) and
+the dictionary engine (SudachiJapaneseStrategy) over the same sentences and
+reports timing, the exact-match rate and the sentences that differ. Sentences
+come from a column of an annotated workbook, or from a small built-in sample:
+
+    python -m benchmarks.japanese_romanization_parity
+    python -m benchmarks.japanese_romanization_parity path/to/trials_and_sessions_annotated.xlsx \
+        --column transcription_original_script --report parity.csv
+"""
+
+import time
+import difflib
+import argparse
+
+import pandas as pd
+
+from inference.transliteration.japanese import JapaneseStrategy, SudachiJapaneseStrategy
+
+SAMPLE = [
+    "今日は天気がいいですね。",
+    "猫が机の上で寝ています。",
+    "私は昨日、友達と東京へ行きました。",
+    "このりんごは赤くて美味しい。",
+    "先生が学生に本を渡した。",
+    "日本語を勉強するのは楽しいです。",
+    "駅までどのくらいかかりますか。",
+    "子供たちは公園で遊んでいる。",
+]
+
+
+def run(engine_cls, sentences):
+    start = time.perf_counter()
+    engine = engine_cls()
+    loaded = time.perf_counter()
+    output = engine.transliterate_batch(sentences)
+    done = time.perf_counter()
+    return output, loaded - start, done - loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Japanese romanization engines")
+    parser.add_argument("excel", nargs="?", help="annotated workbook to read sentences from")
+    parser.add_argument("--column", default="transcription_original_script")
+    parser.add_argument("--report", help="write every sentence pair to this CSV")
+    args = parser.parse_args()
+
+    if args.excel:
+        sentences = [s for s in pd.read_excel(args.excel)[args.column].dropna().astype(str) if s.strip()]
+    else:
+        sentences = SAMPLE
+
+    reference, ref_load, ref_run = run(JapaneseStrategy, sentences)
+    candidate, cand_load, cand_run = run(SudachiJapaneseStrategy, sentences)
+
+    matches = sum(a == b for a, b in zip(reference, candidate))
+    similarity = sum(difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(reference, candidate))
+
+    print(f"{'engine':10} {'load s':>8} {'run s':>8} {'sent/s':>8}")
+    for name, load, run_s in (("spacy", ref_load, ref_run), ("sudachi", cand_load, cand_run)):
+        print(f"{name:10} {load:8.2f} {run_s:8.2f} {len(sentences) / max(run_s, 1e-9):8.1f}")
+    print(f"\nexact match: {matches}/{len(sentences)} ({matches / len(sentences):.1%}), "
+          f"mean character similarity: {similarity / len(sentences):.3f}")
+
+    for sentence, a, b in zip(sentences, reference, candidate):
+        if a != b:
+            print(f"\n{sentence}\n  spacy:   {a}\n  sudachi: {b}")
+
+    if args.report:
+        pd.DataFrame({"sentence": sentences, "spacy": reference, "sudachi": candidate}).to_csv(args.report, index=False)
+        print(f"\nWrote {args.report}")
+
+
+if __name__ == "__main__":
+    main()
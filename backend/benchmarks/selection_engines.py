@@ -0,0 +1,108 @@
+"""
+Sentence selection with the LLM ("generate") against the embedding engine.
+
+Each engine runs SentenceSelector.choose_sentences on the same synthetic
+sheet in a fresh interpreter, so model loading is timed separately and one
+engine's cached weights do not flatter the other. The table lists load time,
+selection time, rows per second, the speedup over "generate" and how many of
+the rows "generate" selected the engine also selected:
+
+    python -m benchmarks.selection_engines
+    python -m benchmarks.selection_engines --rows 2000 --unique 500 --study H1 --device cuda
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+
+ENGINES = ("generate", "embedding")
+SENTENCES = [
+    "Der Mann, der dort wohnt, hat einen großen Hund.",
+    "Ich habe gestern das neue Buch gelesen.",
+    "Die Frau mit dem roten Hut wartet am Bahnhof.",
+    "Es regnet.",
+    "Das Kind, dem ich das Spielzeug gab, lachte.",
+    "Wir gehen morgen ins Kino.",
+    "Der alte Baum vor dem Haus wurde gefällt.",
+    "Ja, genau.",
+]
+
+
+def make_sheet(rows: int, unique: int, seed: int = 0):
+    import pandas as pd
+
+    rng = random.Random(seed)
+    texts = [f"{rng.choice(SENTENCES)} ({i})" for i in range(unique)]
+    return pd.DataFrame({"latin_transcription_everything": [rng.choice(texts) for _ in range(rows)]})
+
+
+def measure(engine: str, args) -> dict:
+    from inference.api_interface.selection import SentenceSelector
+
+    start = time.perf_counter()
+    selector = SentenceSelector(".", args.language, args.study, args.device, engine=engine)
+    loaded = time.perf_counter()
+    try:
+        df = selector.choose_sentences(make_sheet(args.rows, args.unique))
+    finally:
+        selector.close()
+    done = time.perf_counter()
+    selected = df.index[df["latin_transcription_utterance_used"] != ""].tolist()
+    return {
+        "engine": engine,
+        "load_s": loaded - start,
+        "select_s": done - loaded,
+        "rows_per_s": args.rows / max(done - loaded, 1e-9),
+        "selected": selected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sentence selection engines")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--unique", type=int, default=200, help="distinct sentences among the rows")
+    parser.add_argument("--language", default="German")
+    parser.add_argument("--study", default="H1", help="study name; 'H' studies also rank relative clauses")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--single", choices=ENGINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(measure(args.single, args)))
+        return
+
+    results = {}
+    for engine in ENGINES:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.selection_engines", "--single", engine,
+             "--rows", str(args.rows), "--unique", str(args.unique), "--language", args.language,
+             "--study", args.study, "--device", args.device],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            results[engine] = {"engine": engine, "error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+        else:
+            results[engine] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    baseline = results["generate"]
+    print(f"{args.rows} rows, {args.unique} unique sentences, study {args.study}, {args.device}")
+    print("| engine | load s | select s | rows/s | speedup | selected | agrees with generate |")
+    print("|---|---|---|---|---|---|---|")
+    for engine, row in results.items():
+        if "error" in row:
+            print(f"| {engine} | error: {row['error']} |")
+            continue
+        speedup = baseline["select_s"] / row["select_s"] if "error" not in baseline else None
+        agreement = (
+            f"{len(set(row['selected']) & set(baseline['selected']))}/{len(baseline['selected'])}"
+            if "error" not in baseline else "-"
+        )
+        print(f"| {engine} | {row['load_s']:.1f} | {row['select_s']:.2f} | {row['rows_per_s']:.1f} | "
+              f"{'-' if speedup is None else f'{speedup:.1f}x'} | {len(row['selected'])} | {agreement} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Cost of every registered transliteration engine in one table.
+
+Each engine is measured in a fresh interpreter so import and load times are
+not hidden by modules another engine already imported. Columns: import time
+of the engine module, strategy construction (model load), throughput of
+transliterate_batch on a sample column, and resident memory afterwards.
+
+    python -m benchmarks.transliteration_engines
+    python -m benchmarks.transliteration_engines --repeat 500
+"""
+
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+SAMPLES = {
+    "zh": ["今天天气很好。", "我昨天和朋友去了北京。", "这个苹果又红又甜。", "老师把书给了学生。"],
+    "ja": ["今日は天気がいいですね。", "私は昨日、友達と東京へ行きました。", "このりんごは赤くて美味しい。", "先生が学生に本を渡した。"],
+    "ru": ["Сегодня хорошая погода.", "Вчера я ходил с другом в Москву.", "Это яблоко красное и сладкое.", "Учитель дал студенту книгу."],
+    "uk": ["Сьогодні гарна погода.", "Вчора я ходив з другом до Києва.", "Це яблуко червоне і солодке.", "Вчитель дав студентові книжку."],
+}
+
+
+def measure(language: str, engine: str, repeat: int) -> dict:
+    import importlib
+    from inference.transliteration import factory
+
+    module_name, _ = factory.ENGINES[language][engine]
+    start = time.perf_counter()
+    importlib.import_module(module_name)
+    imported = time.perf_counter()
+    strategy = factory.TransliterationStrategyFactory.get_strategy(language, engine)
+    loaded = time.perf_counter()
+
+    # distinct sentences so the batch dedup does not flatter the numbers
+    sentences = [f"{s} {i}" for i in range(repeat) for s in SAMPLES[language]]
+    strategy.transliterate_batch(sentences)
+    done = time.perf_counter()
+
+    return {
+        "language": language,
+        "engine": engine,
+        "import_s": imported - start,
+        "load_s": loaded - imported,
+        "sentences_per_s": len(sentences) / max(done - loaded, 1e-9),
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transliteration engines")
+    parser.add_argument("--repeat", type=int, default=100, help="copies of the sample column to transliterate")
+    parser.add_argument("--single", nargs=2, metavar=("LANGUAGE", "ENGINE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(measure(*args.single, args.repeat)))
+        return
+
+    from inference.transliteration.factory import ENGINES
+
+    rows = []
+    for language, engines in ENGINES.items():
+        for engine in engines:
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.transliteration_engines",
+                 "--single", language, engine, "--repeat", str(args.repeat)],
+                capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                error = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+                rows.append({"language": language, "engine": engine, "error": error})
+            else:
+                rows.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print("| language | engine | import s | load s | sentences/s | peak RSS MB |")
+    print("|---|---|---:|---:|---:|---:|")
+    for row in rows:
+        if "error" in row:
+            print(f"| {row['language']} | {row['engine']} | – | – | – | {row['error']} |")
+        else:
+            print(f"| {row['language']} | {row['engine']} | {row['import_s']:.2f} | {row['load_s']:.2f} "
+                  f"| {row['sentences_per_s']:.0f} | {row['rss_mb']:.0f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Registry of the actions a job can run.
+
+Each action maps to the module and attribute that implement it. Modules are
+imported on first use, so neither the API nor a worker pays for torch,
+whisper, transformers or spaCy until a job actually needs them; a "create
+columns" job never loads them at all.
+"""
+
+import importlib
+from functools import lru_cache
+
+# action -> (module, attribute)
+ACTIONS = {
+    "create columns": ("utils.reorder_columns", "create_columns"),
+    "transcribe": ("inference.api_interface.transcribe", "Transcriber"),
+    "translate": ("inference.api_interface.translate", "Translator"),
+    "gloss": ("inference.api_interface.gloss", "Glosser"),
+    "transliterate": ("inference.api_interface.transliterate", "Transliterator"),
+    "select": ("inference.api_interface.selection", "SentenceSelector"),
+    "pipeline": ("inference.api_interface.pipeline", "Pipeline"),
+}
+
+
+@lru_cache(maxsize=None)
+def load_action(action: str):
+    """The class (or function) implementing `action`, imported on first use."""
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown action {action!r}, expected one of {list(ACTIONS)}")
+    module_name, attribute = ACTIONS[action]
+    return getattr(importlib.import_module(module_name), attribute)
@@ -1,11 +1,11 @@
 import os
 import sys
-import shutil
-import tempfile
+import time
 import logging
 import pandas as pd
-from tqdm import tqdm
 from utils.functions import find_language, format_excel_output, set_global_variables
+from utils.progress import ProgressTracker
+from utils.metrics import timed
 
 from inference.glossing.abstract import GlossingStrategy
 from inference.glossing.factory import GlossingStrategyFactory
@@ -14,24 +14,92 @@ LANGUAGES, NO_LATIN, OBLIGATORY_COLUMNS = set_global_variables()
 
 logger = logging.getLogger(__name__) 
 
+# lines per gloss_batch call; small enough for regular progress, large enough to batch well
+CHUNK_LINES = 512
+
 class Glosser:
-    def __init__(self, input_dir: str, language: str, instruction: str):
+    def __init__(self, input_dir: str, language: str, instruction: str, profile: str = "accurate",
+                 custom_model: str | None = None):
         self.input_dir = input_dir
         self.language_code = find_language(language, LANGUAGES)
         self.instruction = instruction
+        self.profile = profile or "accurate"
+        self.custom_model = custom_model
 
-        self._spacy_data_dir = tempfile.mkdtemp(prefix="spacy_data_")
-        os.environ["SPACY_DATA"] = self._spacy_data_dir
+        self.strategy: GlossingStrategy = GlossingStrategyFactory.acquire(self.language_code, self.profile, self.custom_model)
 
-        self.strategy: GlossingStrategy = GlossingStrategyFactory.get_strategy(self.language_code)
-        self.strategy.load_model()
+    def close(self):
+        """Hand the shared strategy back; it stays warm for later sessions."""
+        if self.strategy is not None:
+            GlossingStrategyFactory.release(self.strategy)
+            self.strategy = None
 
-        try:
-            shutil.rmtree(self._spacy_data_dir)
-        except Exception as err:
-            print(f"Warning: failed to delete spaCy cache: {err}", flush=True)
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def source_column(self) -> str:
+        """The column glossed for this instruction and language."""
+        if self.instruction == "sentences":
+            if self.language_code in NO_LATIN:
+                return "transcription_original_script_utterance_used"
+            return "latin_transcription_utterance_used"
+        elif self.instruction == "corrected":
+            if self.language_code in NO_LATIN:
+                return "transcription_original_script"
+            return "latin_transcription_everything"
+        elif self.instruction == "automatic":
+            return "automatic_transcription"
+        raise ValueError(f"Unsupported instruction: {self.instruction!r}")
+
+    def gloss_df(self, df: pd.DataFrame, progress=None, session: str | None = None) -> pd.DataFrame:
+        """Gloss the source column of `df` into the glossing columns and return it."""
+        column_to_gloss = self.source_column
+        if column_to_gloss not in df.columns:
+            print(f"No column '{column_to_gloss}' found")
+            return df
+
+        source_series = df[column_to_gloss]
+        glossed_utterances = []
+        tokens = 0
+        start = time.perf_counter()
 
-    def process_data(self):
+        # Gloss every line of the column in large batches, then regroup per cell
+        cell_lines = [cell.split("\n") if isinstance(cell, str) else None for cell in source_series]
+        all_lines = [line for lines in cell_lines if lines is not None for line in lines]
+        tracker = ProgressTracker(progress, "gloss", total=len(all_lines), unit="lines", session=session)
+        glossed = []
+        for i in range(0, len(all_lines), CHUNK_LINES):
+            chunk = all_lines[i:i + CHUNK_LINES]
+            with timed(stage="gloss"):
+                chunk_glossed, chunk_tokens = self.strategy.gloss_batch(chunk)
+            glossed.extend(chunk_glossed)
+            tokens += chunk_tokens
+            tracker.advance(len(chunk))
+        glossed_lines = iter(glossed)
+
+        for lines in cell_lines:
+            if lines is not None:
+                glossed_utterances.append("\n".join(next(glossed_lines) for _ in lines))
+            else:
+                glossed_utterances.append("")
+
+        elapsed = time.perf_counter() - start
+        rate = tokens / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Glossed {tokens} tokens in {elapsed:.1f}s "
+            f"({rate:.1f} tokens/s, profile={self.profile})"
+        )
+
+        df["automatic_glossing"] = glossed_utterances
+        df["glossing_utterance_used"] = glossed_utterances
+        return df
+
+    def process_data(self, progress=None):
+        """Gloss every annotated.xlsx below input_dir; `progress` receives ProgressEvents per chunk of lines."""
         try:
             for subdir, dirs, files in os.walk(self.input_dir):
                 for file in files:
@@ -41,39 +109,16 @@ class Glosser:
                     excel_path = os.path.join(subdir, file)
                     df = pd.read_excel(excel_path)
 
-                    if self.instruction == "sentences":
-                        column_to_gloss = "latin_transcription_utterance_used"
-                        if self.language_code in NO_LATIN:
-                            column_to_gloss = "transcription_original_script_utterance_used"
-                    elif self.instruction == "corrected":
-                        column_to_gloss = "latin_transcription_everything"
-                        if self.language_code in NO_LATIN:
-                            column_to_gloss = "transcription_original_script"
-                    elif self.instruction == "automatic":
-                        column_to_gloss = "automatic_transcription"
-                    else:
-                        raise ValueError(f"Unsupported instruction: {self.instruction!r}")
-
+                    column_to_gloss = self.source_column
                     if column_to_gloss not in df.columns:
                         print(f"No column '{column_to_gloss}' found in file: {file}")
                         continue
 
                     print(f"Glossing file: {excel_path} (column: {column_to_gloss!r})")
-                    source_series = df[column_to_gloss]
-                    glossed_utterances = []
-
-                    for cell in tqdm(source_series, desc="Processing sentences", total=len(source_series)):
-                        if isinstance(cell, str):
-                            lines = cell.split("\n")
-                            per_line = [self.strategy.gloss(line) for line in lines]
-                            glossed_utterances.append("\n".join(per_line))
-                        else:
-                            glossed_utterances.append("")
-
-                    df["automatic_glossing"] = glossed_utterances
-                    df["glossing_utterance_used"] = glossed_utterances
-                    df.to_excel(excel_path, index=False, engine="openpyxl")
-                    format_excel_output(excel_path, ["glossing_utterance_used"])
+                    df = self.gloss_df(df, progress, session=os.path.basename(subdir))
+                    with timed(stage="excel_write"):
+                        df.to_excel(excel_path, index=False, engine="openpyxl")
+                        format_excel_output(excel_path, ["glossing_utterance_used"])
 
         except Exception as e:
             logger.error(f"Error: {e}")
@@ -0,0 +1,145 @@
+"""
+Several actions on a session in one pass.
+
+Every stage works on the same in-memory DataFrame of a session's
+trials_and_sessions_annotated.xlsx: the workbook (or, when the pipeline starts
+with "create columns" or "transcribe", the trials file) is read once before
+the first stage, and written once after the last one with every stage's
+output column highlighted.
+"""
+
+import os
+import logging
+from contextlib import nullcontext
+
+import pandas as pd
+
+from utils.functions import write_excel_output, logging_to
+from utils.reorder_columns import update_columns, reorder_columns
+from inference.actions import ACTIONS, load_action
+
+STAGES = tuple(action for action in ACTIONS if action != "pipeline")
+ANNOTATED = "trials_and_sessions_annotated.xlsx"
+TRIALS = ("trials_and_sessions.csv", "trials_and_sessions.xlsx")
+# stages that build the workbook from the trials file rather than reading it
+FROM_TRIALS = ("create columns", "transcribe")
+
+logger = logging.getLogger(__name__)
+
+
+class Pipeline:
+    """
+    Runs `stages` in order on each session below input_dir.
+
+    `guard(stage)` returns a context manager held while a stage runs (a lock
+    for stages that must not run for several sessions at once); `options` are
+    the per-job settings the single actions take (profile, engine, study, ...).
+    """
+
+    def __init__(self, input_dir: str, language: str, instruction: str, stages: list[str],
+                 options: dict | None = None, device: str = "cpu", guard=None):
+        unknown = [stage for stage in stages if stage not in STAGES]
+        if unknown or not stages:
+            raise ValueError(f"Pipeline stages must be a non-empty list of {STAGES}, got {stages!r}")
+        self.input_dir = input_dir
+        self.language = language
+        self.instruction = instruction
+        self.stages = list(stages)
+        self.options = options or {}
+        self.device = device
+        self.guard = guard or (lambda stage: nullcontext())
+        self._workers = {}
+
+    def close(self):
+        for worker in self._workers.values():
+            if hasattr(worker, "close"):
+                worker.close()
+        self._workers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _worker(self, stage):
+        """The processing object of a stage, built on first use (its module is imported and shared models acquired here)."""
+        if stage not in self._workers:
+            options = self.options
+            cls = None if stage == "create columns" else load_action(stage)
+            worker = None
+            if stage == "transcribe":
+                worker = cls(self.input_dir, self.language, self.device)
+            elif stage == "translate":
+                worker = cls(self.input_dir, self.language, self.instruction, self.device)
+            elif stage == "gloss":
+                worker = cls(self.input_dir, self.language, self.instruction,
+                             options.get("profile"), options.get("custom_model"))
+            elif stage == "transliterate":
+                worker = cls(self.input_dir, self.language, self.instruction,
+                             engine=options.get("engine"), style=options.get("tone_style"))
+            elif stage == "select":
+                worker = cls(self.input_dir, self.language, options.get("study") or "", self.device,
+                             quantization=options.get("quantization"),
+                             engine=options.get("selection_engine") or "generate")
+            self._workers[stage] = worker
+        return self._workers[stage]
+
+    def sessions(self) -> list[str]:
+        """Folders below input_dir holding a trials or annotated workbook, in sorted order."""
+        return sorted(
+            subdir for subdir, _, files in os.walk(self.input_dir)
+            if ANNOTATED in files or any(name in files for name in TRIALS)
+        )
+
+    def load(self, base: str) -> pd.DataFrame:
+        annotated = os.path.join(base, ANNOTATED)
+        if self.stages[0] not in FROM_TRIALS:
+            if not os.path.exists(annotated):
+                raise FileNotFoundError(f"No {ANNOTATED} in {base} for stage {self.stages[0]!r}")
+            return pd.read_excel(annotated)
+        for name in TRIALS:
+            path = os.path.join(base, name)
+            if os.path.exists(path):
+                return pd.read_csv(path) if name.endswith(".csv") else pd.read_excel(path)
+        raise FileNotFoundError(f"No trials_and_sessions file found in {base}")
+
+    def run_df(self, df: pd.DataFrame, base: str, progress=None) -> tuple[pd.DataFrame, list[str]]:
+        """Run every stage on `df`; returns it with the columns to highlight."""
+        session = os.path.basename(base)
+        highlight = []
+        for stage in self.stages:
+            logger.info(f"{session}: {stage}")
+            with self.guard(stage):
+                worker = self._worker(stage)
+                df, column = self._run_stage(stage, worker, df, base, progress, session)
+            if column and column in df.columns and column not in highlight:
+                highlight.append(column)
+        return df, highlight
+
+    def _run_stage(self, stage, worker, df, base, progress, session):
+        if stage == "create columns":
+            return reorder_columns(update_columns(df), self.language), None
+        if stage == "transcribe":
+            df = worker.prepare_df(df)
+            with logging_to(logging.getLogger(ACTIONS["transcribe"][0]), os.path.join(base, "transcription.log")):
+                for subdir, _, files in sorted(os.walk(base)):
+                    if "binaries" in os.path.relpath(subdir, base):
+                        df = worker.transcribe_df(df, subdir, files, progress=progress, session=session)
+            return df, worker.output_column
+        if stage == "translate":
+            with logging_to(logging.getLogger(ACTIONS["translate"][0]), os.path.join(base, "translation.log")):
+                return worker.translate_df(df, progress, session=session), worker.output_column
+        if stage == "gloss":
+            return worker.gloss_df(df, progress, session=session), "glossing_utterance_used"
+        if stage == "transliterate":
+            return worker.transliterate_df(df), worker.output_column
+        if stage == "select":
+            return worker.choose_sentences(df, progress=progress), "latin_transcription_utterance_used"
+        raise ValueError(f"Unknown stage {stage!r}")
+
+    def process_data(self, progress=None):
+        """Run the pipeline on every session and write each workbook once."""
+        for base in self.sessions():
+            df, highlight = self.run_df(self.load(base), base, progress)
+            write_excel_output(df, os.path.join(base, ANNOTATED), highlight)
@@ -20,28 +20,238 @@ Leibniz Institute General Linguistics (ZAS)
 """
 
 import os
+import copy
+import time
 import argparse
-import openpyxl
-from openpyxl.styles import Font
 import pandas as pd
 from tqdm import tqdm
 import torch
+import transformers
 from transformers import AutoTokenizer, AutoModelForCausalLM
-from utils.functions import set_global_variables, find_language
+from utils.functions import set_global_variables, find_language, write_excel_output
+from utils.progress import ProgressTracker
+from utils.metrics import timed
+from utils.model_store import get_model_store, load_hf
+from inference.shared import SharedInstances
 
 LANGUAGES, NO_LATIN, OBLIGATORY_COLUMNS = set_global_variables()
 
+MODEL_NAME = "meta-llama/Llama-3.2-1B"
+EMBEDDING_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+ENGINES = ("generate", "embedding")
+QUANTIZATIONS = (None, "int8", "4bit")
+MAX_NEW_TOKENS = 30
+# what the embedding engine scores sentences against: noun phrases always,
+# relative clauses for H studies
+NOUN_PHRASE_TOPIC = "a sentence with a descriptive noun phrase, such as 'the old man with the big dog'"
+RELATIVE_CLAUSE_TOPIC = "a sentence with a relative clause, such as 'the woman who lives next door'"
+
+# Loaded selector models, shared by every SentenceSelector in this process
+MODELS = SharedInstances("selector")
+
+
+def _converted_path(model_name, quantization, extension=""):
+    """Where the converted weights live; versioned because int8 artifacts are pickled modules."""
+    name = model_name.replace("/", "__")
+    versions = f"torch{torch.__version__}-transformers{transformers.__version__}".replace("+", "_")
+    return get_model_store().root / "converted" / f"{name}-{quantization}-{versions}{extension}"
+
+
+def _build_model(model_name, quantization, device):
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+
+    tokenizer = load_hf(model_name, AutoTokenizer.from_pretrained)
+    # Llama has no pad token; pad on the left so every prompt ends where generation starts
+    tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+
+    if quantization is None:
+        model = load_hf(model_name, lambda path: AutoModelForCausalLM.from_pretrained(path).to(device))
+
+    elif quantization == "int8":
+        # dynamic int8 Linear layers; the converted module is cached on disk
+        artifact = _converted_path(model_name, quantization, ".pt")
+        if artifact.exists():
+            start = time.perf_counter()
+            model = torch.load(artifact, weights_only=False)
+            get_model_store().record_load("converted", artifact.name, time.perf_counter() - start)
+        else:
+            model = load_hf(model_name, AutoModelForCausalLM.from_pretrained)
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            artifact.parent.mkdir(parents=True, exist_ok=True)
+            torch.save(model, artifact)
+
+    else:
+        from transformers import BitsAndBytesConfig
+
+        artifact = _converted_path(model_name, quantization)
+        if artifact.exists():
+            start = time.perf_counter()
+            model = AutoModelForCausalLM.from_pretrained(artifact)
+            get_model_store().record_load("converted", artifact.name, time.perf_counter() - start)
+        else:
+            config = BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_compute_dtype=torch.bfloat16)
+            model = load_hf(model_name, lambda path: AutoModelForCausalLM.from_pretrained(
+                path, quantization_config=config, device_map=device))
+            model.save_pretrained(artifact)
+
+    model.eval()
+    return model, tokenizer
+
+
+def _build_embedding_model(model_name, device):
+    from sentence_transformers import SentenceTransformer
+    return load_hf(model_name, lambda path: SentenceTransformer(str(path), device=device))
+
+
 class SentenceSelector():
-    def __init__(self, input_dir, language, study, device):
+    def __init__(self, input_dir, language, study, device, batch_size=8, quantization=None, threads=None,
+                 engine="generate", threshold=0.5, top_k=None):
         self.input_dir = input_dir
         self.language = language
         self.language_code = find_language(language, LANGUAGES)
         self.study = study
         self.device = device
-        self.model = AutoModelForCausalLM.from_pretrained("meta-llama/Llama-3.2-1B")
-        self.tokenizer = AutoTokenizer.from_pretrained("meta-llama/Llama-3.2-1B")
+        self.batch_size = batch_size
+        self.quantization = quantization
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown selection engine {engine!r}, expected one of {ENGINES}")
+        if engine == "generate" and quantization == "4bit" and not (
+                str(device).startswith("cuda") and torch.cuda.is_available()):
+            # bitsandbytes 4-bit kernels only run on CUDA
+            raise ValueError(f"4bit quantization needs a CUDA device (got {device!r}); use int8 on CPU")
+        self.engine = engine
+        self.threshold = threshold
+        self.top_k = top_k
+
+        # torch's thread count is process-wide; close() restores it for the worker's next job
+        self._threads_before = None
+        threads = threads or os.getenv("TGT_SELECTOR_THREADS")
+        if threads:
+            self._threads_before = torch.get_num_threads()
+            torch.set_num_threads(int(threads))
+
+        self._shared = None
+        try:
+            if engine == "embedding":
+                self._shared = MODELS.acquire(
+                    (EMBEDDING_MODEL_NAME, None, device),
+                    lambda: _build_embedding_model(EMBEDDING_MODEL_NAME, device),
+                )
+                self.model, self.tokenizer = self._shared, None
+            else:
+                self._shared = MODELS.acquire(
+                    (MODEL_NAME, quantization, device),
+                    lambda: _build_model(MODEL_NAME, quantization, device),
+                )
+                self.model, self.tokenizer = self._shared
+        except BaseException:
+            self.close()
+            raise
+        self._prefix = None
+        self.stats = {}
+
+    def close(self):
+        """Hand the shared model back; it stays loaded for later runs."""
+        if self._shared is not None:
+            MODELS.release(self._shared)
+            self._shared = None
+        if self._threads_before is not None:
+            torch.set_num_threads(self._threads_before)
+            self._threads_before = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-    def choose_sentences(self, df, verbose=False):
+    def _encode_prefix(self, prompt):
+        """
+        Run the constant instruction prompt through the model once and keep
+        its key/value cache; every sentence is then generated on top of it.
+        """
+        if self._prefix is not None and self._prefix[0] == prompt:
+            return self._prefix[1], self._prefix[2]
+        prefix_ids = self.tokenizer(prompt, return_tensors="pt").input_ids.to(self.device)
+        with torch.no_grad():
+            cache = self.model(prefix_ids, use_cache=True).past_key_values
+        self._prefix = (prompt, prefix_ids, cache)
+        return prefix_ids, cache
+
+    def generate_responses(self, prompt, texts, on_batch=None):
+        """
+        Generate one response per text, in padded batches that share the prompt
+        cache. `on_batch(texts)` is called with the texts of every finished batch.
+        """
+        prefix_ids, prefix_cache = self._encode_prefix(prompt)
+        prefix_len = prefix_ids.shape[1]
+        responses = []
+
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            n = len(batch)
+            suffixes = self.tokenizer(
+                [f" {text} Write your response: \n" for text in batch],
+                add_special_tokens=False,
+                padding=True,
+                return_tensors="pt",
+            ).to(self.device)
+
+            # [prompt | left padding | sentence]: the padding is masked out,
+            # so positions continue right after the cached prompt
+            input_ids = torch.cat([prefix_ids.expand(n, -1), suffixes.input_ids], dim=1)
+            attention_mask = torch.cat(
+                [torch.ones((n, prefix_len), dtype=suffixes.attention_mask.dtype, device=self.device),
+                 suffixes.attention_mask],
+                dim=1,
+            )
+            # generate() extends the cache in place, so each batch gets its own copy
+            cache = copy.deepcopy(prefix_cache)
+            cache.batch_repeat_interleave(n)
+
+            with torch.no_grad(), timed(stage="select"):
+                generate_ids = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    past_key_values=cache,
+                    max_new_tokens=MAX_NEW_TOKENS,
+                    do_sample=False,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                )
+            new_tokens = generate_ids[:, input_ids.shape[1]:]
+            responses.extend(r.strip() for r in self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True))
+            if on_batch:
+                on_batch(batch)
+        return responses
+
+    def select_by_embedding(self, topics, texts):
+        """
+        Score every text against the topic descriptions with the sentence
+        embedding model (cosine similarity, best topic wins) and keep the
+        texts above the threshold, or the top_k best if top_k is set.
+        Selected texts are returned as their own response, others as "".
+        """
+        if not texts:
+            return []
+        topic_embeddings = self.model.encode(topics, normalize_embeddings=True, convert_to_tensor=True)
+        text_embeddings = self.model.encode(
+            texts, batch_size=max(self.batch_size, 64), normalize_embeddings=True, convert_to_tensor=True
+        )
+        scores = (text_embeddings @ topic_embeddings.T).max(dim=1).values
+
+        if self.top_k:
+            keep = set(torch.topk(scores, min(self.top_k, len(texts))).indices.tolist())
+        else:
+            keep = set(torch.nonzero(scores >= self.threshold).flatten().tolist())
+        return [text if i in keep else "" for i, text in enumerate(texts)]
+
+    def choose_sentences(self, df, verbose=False, progress=None):
+        """
+        Fill the target column with the selected sentences. `progress` receives
+        ProgressEvents counting the rows handled so far.
+        """
         # Handle the case where the language is non-Latin:
         if self.language_code in NO_LATIN:
             raise NotImplementedError("Function for no latin languages not implemented yet.")
@@ -63,33 +273,45 @@ class SentenceSelector():
         df[target] = ""
         df[target] = df[target].astype('object') 
 
-        # Process each non-null sentence in the source column
-        for text in df[source].dropna():
-            # Identify all occurrences of the sentence in the DataFrame
-            series = df[df.isin([text])].stack()
-            for idx, _ in series.items():
-                # Initialize target cell if it is NaN
-                if pd.isna(df.at[idx[0], target]):
-                    df.at[idx[0], target] = ""
-                
-                # Append text to the prompt for this sentence
-                order = f"{prompt} {text} Write your response: \n"
-                # Use the complete prompt (order) when tokenizing
-                inputs = self.tokenizer(order, return_tensors="pt")
-                generate_ids = self.model.generate(inputs.input_ids, max_length=30)
-                response = self.tokenizer.batch_decode(generate_ids, skip_special_tokens=True)[0]
-                # Clean up the response by removing the prompt parts
-                response = response.replace(prompt, "").replace("Write your response:", "").strip()
-                if verbose:
-                    print(f"Response: {response}")
-                if response == "":
-                    continue
-                df.at[idx[0], target] += response + "\n"
+        # Index the rows of every distinct sentence so each is generated only once
+        non_null = df[source].dropna()
+        rows_by_text = {}
+        for idx, text in non_null.items():
+            rows_by_text.setdefault(text, []).append(idx)
+        texts = list(rows_by_text)
+
+        # a sentence counts for every row that holds it
+        tracker = ProgressTracker(progress, "select", total=len(non_null), unit="rows")
+        def on_batch(batch):
+            tracker.advance(sum(len(rows_by_text[text]) for text in batch))
+
+        start = time.perf_counter()
+        if self.engine == "embedding":
+            topics = [NOUN_PHRASE_TOPIC] + ([RELATIVE_CLAUSE_TOPIC] if 'H' in self.study else [])
+            with timed(stage="select"):
+                responses = self.select_by_embedding(topics, texts)
+            on_batch(texts)
+        else:
+            responses = self.generate_responses(prompt, texts, on_batch=on_batch)
+        self.stats = {
+            "rows": len(non_null),
+            "unique": len(texts),
+            "duplicates": len(non_null) - len(texts),
+            "seconds": time.perf_counter() - start,
+        }
+
+        # Fan each response out to every row holding that sentence
+        for text, response in zip(texts, responses):
+            if verbose:
+                print(f"Response: {response}")
+            if response == "":
+                continue
+            df.loc[rows_by_text[text], target] = response + "\n"
         
         return df
 
         
-    def process_data(self, verbose=False):
+    def process_data(self, verbose=False, progress=None):
         files_to_process = []
         for subdir, _, files in os.walk(self.input_dir):
             for file in files:
@@ -99,39 +321,15 @@ class SentenceSelector():
         # Process each file individually
         for file_path in tqdm(files_to_process, desc="Processing Files", unit="file"):
             print(f"Processing {file_path}...")
+            start = time.perf_counter()
             df = pd.read_excel(file_path)
-            df = self.choose_sentences(df, verbose=verbose)
-            df.to_excel(file_path, index=False)
-
-            # Open the Excel file and modify cell formatting
-            wb = openpyxl.load_workbook(file_path)
-            ws = wb.active  # Select the first sheet
-
-            # Define the red font style
-            red_font = Font(color="FF0000")  # Hex code for red color
-
-
-            target_column = 'latin_transcription_utterance_used'
-
-            # Get the header row (first row) as a tuple of column names
-            header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True))
-
-            # Ensure the target column exists
-            if target_column not in header_row:
-                raise ValueError(f"Target column '{target_column}' not found in header row.")
-
-            # Find the column index (1-based) for the target column
-            target_index = header_row.index(target_column) + 1
-
-            # Apply red font to each cell in the target column (skip header row)
-            for row in ws.iter_rows(min_row=2):
-                cell = row[target_index - 1]  # Adjust for 0-based index in row
-                if cell.value:
-                    cell.font = red_font
-
-            # Save the modified Excel file
-            wb.save(file_path)
-
+            df = self.choose_sentences(df, verbose=verbose, progress=progress)
+            print(
+                f"{os.path.basename(file_path)}: {self.stats['rows']} sentences, {self.stats['unique']} unique "
+                f"({self.stats['duplicates']} duplicates not regenerated), generation {self.stats['seconds']:.1f}s, "
+                f"total {time.perf_counter() - start:.1f}s"
+            )
+            write_excel_output(df, file_path, ['latin_transcription_utterance_used'])
 
         print("Processing completed.")
 
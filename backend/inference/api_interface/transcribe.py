@@ -19,6 +19,7 @@ import logging
 import warnings
 import pandas as pd
 from tqdm import tqdm
+from functools import lru_cache
 from dotenv import load_dotenv
 from whisperx.diarize import DiarizationPipeline
 from openpyxl.styles import Font
@@ -34,6 +35,8 @@ from utils.functions import (
     setup_logging,
     format_excel_output
 )
+from utils.progress import ProgressTracker
+from utils.metrics import timed
 
 # Global setup
 LANGUAGES, NO_LATIN, OBLIGATORY_COLUMNS = set_global_variables()
@@ -41,14 +44,19 @@ warnings.filterwarnings("ignore")
 
 logger = logging.getLogger(__name__)
 
-ffmpeg_path = find_ffmpeg()
-
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 
 
+@lru_cache(maxsize=None)
+def _ffmpeg():
+    # looked up (or installed) once per process, when the first Transcriber is built
+    return find_ffmpeg()
+
+
 class Transcriber:
     def __init__(self, input_dir, language, device=None):
+        self.ffmpeg_path = _ffmpeg()
         self.input_dir = input_dir
         self.language_code = find_language(language, LANGUAGES)
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
@@ -83,6 +91,10 @@ class Transcriber:
         else:
             raise FileNotFoundError("No trials_and_sessions file found in the directory.")
 
+        return self.prepare_df(df), excel_out
+
+    def prepare_df(self, df):
+        """Add the columns transcriptions are written into."""
         for col in OBLIGATORY_COLUMNS:
             df[col] = df.get(col, "")
 
@@ -90,13 +102,17 @@ class Transcriber:
             df["transcription_original_script"] = ""
             df["transcription_original_script_utterance_used"] = ""
 
-        return df, excel_out
+        return df
+
+    @property
+    def output_column(self):
+        return 'transcription_original_script' if self.language_code in NO_LATIN else 'latin_transcription_everything'
 
     def add_transcription_to_df(self, df, file, transcription, count, filename_regexp):
         series = df[df.isin([file])].stack()
         text_auto = f"{count}: {transcription}"
         text_suffix = " - " if series.empty else " "
-        col_name = 'transcription_original_script' if self.language_code in NO_LATIN else 'latin_transcription_everything'
+        col_name = self.output_column
 
         if series.empty:
             match = filename_regexp.search(file)
@@ -126,19 +142,26 @@ class Transcriber:
                              'ur', 'te', 'hi', 'ca', 'ml', 'no', 'nn', 'sk', 'sl', 'hr', 'ro',
                              'eu', 'gl', 'ka', 'lv', 'tl', 'zh']:
             model = None
-            try:
-                model = whisperx.load_model("large-v2", self.device, compute_type="float16", language=self.language_code)
-            except:
-                model = whisperx.load_model("large-v2", self.device, compute_type="int8", language=self.language_code)
-            audio = whisperx.load_audio(path_to_audio)
-            result = model.transcribe(audio, batch_size=self.batch_size, language=self.language_code)
-
-            model_a, metadata = whisperx.load_align_model(language_code=result["language"], device=self.device)
-            result = whisperx.align(result["segments"], model_a, metadata, audio, self.device)
-
-            diarize_model = DiarizationPipeline(model_name="pyannote/speaker-diarization-3.1", use_auth_token=self.hugging_key, device=self.device)
-            diarize_segments = diarize_model(audio)
-            result = whisperx.assign_word_speakers(diarize_segments, result)
+            with timed("tgt_model_load_seconds", model="whisperx"):
+                try:
+                    model = whisperx.load_model("large-v2", self.device, compute_type="float16", language=self.language_code)
+                except:
+                    model = whisperx.load_model("large-v2", self.device, compute_type="int8", language=self.language_code)
+            with timed(stage="decode"):
+                audio = whisperx.load_audio(path_to_audio)
+            with timed(stage="asr"):
+                result = model.transcribe(audio, batch_size=self.batch_size, language=self.language_code)
+
+            with timed("tgt_model_load_seconds", model="whisperx_align"):
+                model_a, metadata = whisperx.load_align_model(language_code=result["language"], device=self.device)
+            with timed(stage="align"):
+                result = whisperx.align(result["segments"], model_a, metadata, audio, self.device)
+
+            with timed("tgt_model_load_seconds", model="pyannote_diarization"):
+                diarize_model = DiarizationPipeline(model_name="pyannote/speaker-diarization-3.1", use_auth_token=self.hugging_key, device=self.device)
+            with timed(stage="diarize"):
+                diarize_segments = diarize_model(audio)
+                result = whisperx.assign_word_speakers(diarize_segments, result)
 
             full_sentences, buffer_speaker, buffer_text = [], None, ""
             for seg in result["segments"]:
@@ -158,15 +181,16 @@ class Transcriber:
                 full_sentences.append(f"{buffer_speaker}: {buffer_text}")
 
         else:
-            model = whisper.load_model("large-v2", self.device)
-            res = model.transcribe(path_to_audio, language=self.language_code)
+            with timed("tgt_model_load_seconds", model="whisper"):
+                model = whisper.load_model("large-v2", self.device)
+            with timed(stage="asr"):
+                res = model.transcribe(path_to_audio, language=self.language_code)
             return res["text"]
 
         return "  ".join(full_sentences)
 
-    def process_data(self, verbose=True):
-        filename_regexp = re.compile(r'blockNr_(?P<block>\d+)_taskNr_(?P<task>\d+)_trialNr_(?P<trial>\d+).*')
-
+    def process_data(self, verbose=True, progress=None):
+        """Transcribe the audio of every session below input_dir; `progress` receives ProgressEvents."""
         for subdir, _, files in os.walk(self.input_dir):
             if 'binaries' not in subdir:
                 continue
@@ -184,24 +208,35 @@ class Transcriber:
                 fh.close()
                 continue
 
-            count = 0
-            files.sort()
-            for file in tqdm(files, desc="Transcribing"):
-                if not file.lower().endswith(('.mp3', '.mp4', '.m4a')):
-                    continue
-                count += 1
-                path = os.path.abspath(os.path.join(subdir, file))
-                logger.info(f"Processing file: {file} ({count}/{len(files)})")
-                try:
-                    text = self.transcribe_and_diarize(path)
-                    if self.language_code == 'de':
-                        text = clean_string(text)
-                    if verbose:
-                        tqdm.write(text)
-                    self.add_transcription_to_df(df, file, text, count, filename_regexp)
-                except Exception as e:
-                    logger.error(f"Error on '{file}': {e}")
-            df.to_excel(out_file, index=False)
-            format_excel_output(out_file, 'transcription_original_script' if self.language_code in NO_LATIN else 'latin_transcription_everything')
+            df = self.transcribe_df(df, subdir, files, verbose=verbose, progress=progress,
+                                    session=os.path.basename(base))
+            with timed(stage="excel_write"):
+                df.to_excel(out_file, index=False)
+                format_excel_output(out_file, self.output_column)
             logger.removeHandler(fh)
             fh.close()
+
+    def transcribe_df(self, df, audio_dir, files=None, verbose=False, progress=None, session=None):
+        """Transcribe the audio files in `audio_dir` into the rows of `df` they belong to."""
+        filename_regexp = re.compile(r'blockNr_(?P<block>\d+)_taskNr_(?P<task>\d+)_trialNr_(?P<trial>\d+).*')
+        if files is None:
+            files = os.listdir(audio_dir)
+
+        count = 0
+        audio = sorted(file for file in files if file.lower().endswith(('.mp3', '.mp4', '.m4a')))
+        tracker = ProgressTracker(progress, "transcribe", total=len(audio), unit="files", session=session)
+        for file in tqdm(audio, desc="Transcribing"):
+            count += 1
+            path = os.path.abspath(os.path.join(audio_dir, file))
+            logger.info(f"Processing file: {file} ({count}/{len(audio)})")
+            try:
+                text = self.transcribe_and_diarize(path)
+                if self.language_code == 'de':
+                    text = clean_string(text)
+                if verbose:
+                    tqdm.write(text)
+                self.add_transcription_to_df(df, file, text, count, filename_regexp)
+            except Exception as e:
+                logger.error(f"Error on '{file}': {e}")
+            tracker.advance()
+        return df
@@ -4,6 +4,8 @@ import logging
 import pandas as pd
 from tqdm import tqdm
 from utils.functions import find_language, setup_logging, format_excel_output, set_global_variables
+from utils.progress import ProgressTracker
+from utils.metrics import timed
 
 from inference.translation.abstract import TranslationStrategy
 from inference.translation.factory import TranslationStrategyFactory
@@ -36,8 +38,7 @@ class Translator:
         self.instruction = self._normalize_instruction(instruction)
         self.device = device
 
-        self.strategy: TranslationStrategy = TranslationStrategyFactory.get_strategy(self.language_code)
-        self.strategy.load_model()
+        self.strategy: TranslationStrategy = TranslationStrategyFactory.acquire(self.language_code, self.device)
 
         logger.info(
             f"Initialized Translator (language={language}, code={self.language_code}, "
@@ -45,6 +46,18 @@ class Translator:
             f"strategy={self.strategy.__class__.__name__})"
         )
 
+    def close(self):
+        """Hand the shared strategy back; it stays warm for later sessions."""
+        if self.strategy is not None:
+            TranslationStrategyFactory.release(self.strategy)
+            self.strategy = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     @staticmethod
     def _normalize_instruction(instruction: str) -> str:
         """
@@ -57,14 +70,20 @@ class Translator:
         }
         return mapping.get(instruction, instruction)
 
-    def process_data(self, verbose: bool = False) -> None:
+    @property
+    def output_column(self) -> str | None:
+        """The translation column highlighted in the saved workbook."""
+        return {
+            "automatic": "automatic_translation_automatic_transcription",
+            "corrected": "automatic_translation_corrected_transcription",
+            "sentences": "translation_utterance_used",
+        }.get(self.instruction)
+
+    def translate_df(self, df: pd.DataFrame, progress=None, session: str | None = None) -> pd.DataFrame:
         """
-        Walks through the input directory, translates rows in each annotated.xlsx file,
-        saves the updated file, and highlights the chosen translation column.
+        Translate up to the first 100 rows of `df` into the instruction's target
+        columns and return it with non-obligatory columns first.
         """
-        start_time = time.time()
-        logger.info(f"Starting translation for directory: {self.input_dir}")
-
         # Define source-column names based on instruction
         auto_col = "automatic_transcription"
         corr_col = "latin_transcription_everything"
@@ -75,6 +94,71 @@ class Translator:
             corr_col = "transcription_original_script"
             sent_col = "transcription_original_script_utterance_used"
 
+        # Map of which target columns to write into for each instruction
+        cols_map = {
+            "corrected": [
+                "automatic_translation_corrected_transcription",
+                "translation_everything",
+            ],
+            "automatic": ["automatic_translation_automatic_transcription"],
+            "sentences": [
+                "automatic_translation_utterance_used",
+                "translation_utterance_used",
+            ],
+        }
+
+        tracker = ProgressTracker(progress, "translate", total=min(len(df), 100), unit="rows", session=session)
+
+        # Iterate row-wise, up to 100 rows
+        for idx, row in df.iterrows():
+            if idx >= 100:
+                logger.info(f"Reached max rows at {idx}")
+                break
+            tracker.advance()
+
+            # Select the appropriate source column
+            if self.instruction == "corrected":
+                source_col = corr_col
+            elif self.instruction == "automatic":
+                source_col = auto_col
+            else:
+                source_col = sent_col
+
+            text = row.get(source_col)
+            if pd.isna(text) or not str(text).strip():
+                logger.info(f"Skipping row {idx}: empty text in '{source_col}'")
+                continue
+
+            try:
+                # Delegate translation to the chosen strategy
+                with timed(stage="translate"):
+                    translation = self.strategy.translate(str(text))
+
+                if not translation:
+                    logger.info(f"No translation obtained for row {idx}")
+                    continue
+
+                # Write translation into each target column
+                for target_col in cols_map[self.instruction]:
+                    df.at[idx, target_col] = translation
+
+            except Exception as e:
+                logger.exception(f"Row {idx} translation error: {e}")
+                continue
+
+        # Reorder columns: non‐obligatory first, then obligatory
+        extra_cols = [c for c in df.columns if c not in OBLIGATORY_COLUMNS]
+        return df[extra_cols + [c for c in OBLIGATORY_COLUMNS if c in df.columns]]
+
+    def process_data(self, verbose: bool = False, progress=None) -> None:
+        """
+        Walks through the input directory, translates rows in each annotated.xlsx file,
+        saves the updated file, and highlights the chosen translation column.
+        `progress` receives a ProgressEvent per translated row (throttled).
+        """
+        start_time = time.time()
+        logger.info(f"Starting translation for directory: {self.input_dir}")
+
         # Find all "*annotated.xlsx" files recursively
         files = [
             os.path.join(dp, f)
@@ -89,77 +173,19 @@ class Translator:
             try:
                 logger.info(f"Processing file: {file_path}")
                 df = pd.read_excel(file_path)
+                df = self.translate_df(df, progress, session=os.path.basename(os.path.dirname(file_path)))
+
+                with timed(stage="excel_write"):
+                    # Save back to the same file (overwrites)
+                    df.to_excel(file_path, index=False)
 
-                # Map of which target columns to write into for each instruction
-                cols_map = {
-                    "corrected": [
-                        "automatic_translation_corrected_transcription",
-                        "translation_everything",
-                    ],
-                    "automatic": ["automatic_translation_automatic_transcription"],
-                    "sentences": [
-                        "automatic_translation_utterance_used",
-                        "translation_utterance_used",
-                    ],
-                }
-
-                # Iterate row-wise, up to 100 rows
-                for idx, row in df.iterrows():
-                    if idx >= 100:
-                        logger.info(f"Reached max rows at {idx}")
-                        break
-
-                    # Select the appropriate source column
-                    if self.instruction == "corrected":
-                        source_col = corr_col
-                    elif self.instruction == "automatic":
-                        source_col = auto_col
-                    else:
-                        source_col = sent_col
-
-                    text = row.get(source_col)
-                    if pd.isna(text) or not str(text).strip():
-                        logger.info(f"Skipping row {idx}: empty text in '{source_col}'")
-                        continue
-
-                    try:
-                        # Delegate translation to the chosen strategy
-                        translation = self.strategy.translate(str(text))
-
-                        if not translation:
-                            logger.info(f"No translation obtained for row {idx}")
-                            continue
-
-                        # Write translation into each target column
-                        for target_col in cols_map[self.instruction]:
-                            df.at[idx, target_col] = translation
-
-                    except Exception as e:
-                        logger.exception(f"Row {idx} translation error: {e}")
-                        continue
-
-                # Reorder columns: non‐obligatory first, then obligatory
-                extra_cols = [c for c in df.columns if c not in OBLIGATORY_COLUMNS]
-                df = df[extra_cols + [c for c in OBLIGATORY_COLUMNS if c in df.columns]]
-
-                # Save back to the same file (overwrites)
-                df.to_excel(file_path, index=False)
-
-                # Determine which column to highlight
-                if self.instruction == "automatic":
-                    column_to_highlight = "automatic_translation_automatic_transcription"
-                elif self.instruction == "corrected":
-                    column_to_highlight = "automatic_translation_corrected_transcription"
-                elif self.instruction == "sentences":
-                    column_to_highlight = "translation_utterance_used"
-                else:
-                    column_to_highlight = None
-
-                # Apply Excel formatting highlight if column exists
-                if column_to_highlight and column_to_highlight in df.columns:
-                    format_excel_output(file_path, column_to_highlight)
+                    # Apply Excel formatting highlight if column exists
+                    column_to_highlight = self.output_column
+                    if column_to_highlight and column_to_highlight in df.columns:
+                        format_excel_output(file_path, column_to_highlight)
 
             finally:
                 logger.removeHandler(handler)
+                handler.close()
 
         logger.info(f"Completed translation in {time.time() - start_time:.2f}s")
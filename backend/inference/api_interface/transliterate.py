@@ -2,6 +2,8 @@ import os
 import pandas as pd
 from tqdm import tqdm
 from utils.functions import find_language, format_excel_output, set_global_variables
+from utils.progress import ProgressTracker
+from utils.metrics import timed
 
 
 from inference.transliteration.abstract import TransliterationStrategy
@@ -18,52 +20,86 @@ class Transliterator:
         instruction: Type of processing ('sentences' or 'corrected')
         device: Unused here but kept for consistency
         language_code: Determined by find_language()
+        engine: Optional engine name for languages with several engines
+        style: Optional output style (e.g. the pinyin tone style for Chinese)
         strategy: Concrete TransliterationStrategy instance
     """
 
-    def __init__(self, input_dir: str, language: str, instruction: str, device: str = 'cpu'):
+    def __init__(self, input_dir: str, language: str, instruction: str, device: str = 'cpu',
+                 engine: str | None = None, style: str | None = None):
         self.input_dir = input_dir
         self.instruction = instruction
         self.device = device
         self.language_code = find_language(language, LANGUAGES)
-        self.strategy: TransliterationStrategy = TransliterationStrategyFactory.get_strategy(self.language_code)
+        self.engine = engine
+        self.style = style
+        self.strategy: TransliterationStrategy = TransliterationStrategyFactory.acquire(self.language_code, engine, style)
 
-    def transliterate_df(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Apply transliteration to the DataFrame and return it."""
+    def close(self):
+        """Hand the shared strategy back; it stays warm for later sessions."""
+        if self.strategy is not None:
+            TransliterationStrategyFactory.release(self.strategy)
+            self.strategy = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def columns(self) -> tuple[str, str]:
+        """The (source, target) columns for this instruction."""
         if self.instruction == 'sentences':
-            source = 'transcription_original_script_utterance_used'
-            target = 'latin_transcription_utterance_used'
+            return 'transcription_original_script_utterance_used', 'latin_transcription_utterance_used'
         elif self.instruction == 'corrected':
-            source = 'transcription_original_script'
-            target = 'latin_transcription_everything'
+            return 'transcription_original_script', 'latin_transcription_everything'
+        raise ValueError(f"Unsupported instruction: {self.instruction}")
+
+    @property
+    def output_column(self) -> str:
+        return self.columns[1]
+
+    def transliterate_df(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply transliteration to the DataFrame and return it."""
+        source, target = self.columns
+
+        # Keep whatever the target column already holds; missing cells become ""
+        if target in df.columns:
+            existing = df[target].astype(object).where(df[target].notna(), "")
         else:
-            raise ValueError(f"Unsupported instruction: {self.instruction}")
-
-        # Initialize or clear target column
-        df[target] = df.get(target, "").astype(object)
-
-        # Iterate through non-null sentences
-        for sentence in df[source].dropna():
-            series = df[df.isin([sentence])].stack()
-            for idx, _ in series.items():
-                if pd.isna(df.at[idx[0], target]):
-                    df.at[idx[0], target] = ""
-                transliterated = self.strategy.transliterate(sentence)
-                if transliterated not in df.at[idx[0], target]:
-                    df.at[idx[0], target] += f"{transliterated} "
+            existing = pd.Series("", index=df.index, dtype=object)
+
+        # Transliterate every distinct source value once, then map it onto its rows
+        sources = df[source]
+        mask = sources.notna()
+        unique = list(pd.unique(sources[mask]))
+        with timed(stage="transliterate"):
+            transliterations = dict(zip(unique, self.strategy.transliterate_batch(unique)))
+        mapped = sources[mask].map(transliterations)
+
+        # Don't append a transliteration the cell already contains
+        df[target] = existing
+        df.loc[mask, target] = [
+            current if new in str(current) else f"{current}{new} "
+            for current, new in zip(existing[mask], mapped)
+        ]
         return df
 
-    def process_data(self):
-        """Walk input_dir, transliterate each annotated.xlsx file, and save results."""
+    def process_data(self, progress=None):
+        """Walk input_dir, transliterate each annotated.xlsx file, and save results; report per file to `progress`."""
         files_to_process = []
         for subdir, _, files in os.walk(self.input_dir):
             for file in files:
                 if file.endswith('annotated.xlsx'):
                     files_to_process.append(os.path.join(subdir, file))
 
+        tracker = ProgressTracker(progress, "transliterate", total=len(files_to_process), unit="files")
         for file_path in tqdm(files_to_process, desc="Processing Files", unit="file"):
             print(f"Processing {file_path}...")
             df = pd.read_excel(file_path)
             df = self.transliterate_df(df)
-            df.to_excel(file_path, index=False)
-            format_excel_output(file_path, 'latin_transcription_everything')
+            with timed(stage="excel_write"):
+                df.to_excel(file_path, index=False)
+                format_excel_output(file_path, [self.output_column])
+            tracker.advance()
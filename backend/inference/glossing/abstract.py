@@ -1,4 +1,6 @@
+import threading
 from abc import ABC, abstractmethod
+from tqdm import tqdm
 
 class GlossingStrategy(ABC):
     """
@@ -6,9 +8,19 @@ class GlossingStrategy(ABC):
     Subclasses must implement:
       - load_model()
       - gloss_sentence(sentence: str) -> str
+
+    Strategies add the number of tokens they analysed to `tokens_processed`
+    so callers can report throughput.
+
+    One loaded strategy is shared by every session of a worker (see
+    GlossingStrategyFactory), and the spaCy/stanza pipelines and translators
+    behind it are not safe to call from several threads, so gloss_batch()
+    holds the instance's lock.
     """
     def __init__(self, language_code: str):
         self.language_code = language_code
+        self.tokens_processed = 0
+        self.lock = threading.Lock()
 
     @abstractmethod
     def load_model(self):
@@ -17,3 +29,20 @@ class GlossingStrategy(ABC):
     @abstractmethod
     def gloss(self, sentence: str) -> str:
         raise NotImplementedError("Subclasses must implement gloss_sentence()")
+
+    def close(self):
+        """Release what load_model() acquired from other shared caches (called on eviction)."""
+
+    def gloss_lines(self, sentences: list[str]) -> list[str]:
+        """
+        Gloss a whole column of sentences. The default glosses them one by
+        one; strategies with a cheaper bulk path may override it.
+        """
+        return [self.gloss(sentence) for sentence in tqdm(sentences, desc="Processing sentences")]
+
+    def gloss_batch(self, sentences: list[str]) -> tuple[list[str], int]:
+        """Gloss `sentences` under the instance lock; return the glosses and the tokens analysed for them."""
+        with self.lock:
+            before = self.tokens_processed
+            glossed = self.gloss_lines(sentences)
+            return glossed, self.tokens_processed - before
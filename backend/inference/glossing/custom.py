@@ -1,30 +1,57 @@
 import re
+import time
 import spacy
 
-from pathlib import Path
 from utils.functions import load_glossing_rules
+from utils.model_store import get_model_store
 from inference.glossing.abstract import GlossingStrategy
-from inference.translation.factory import TranslationStrategyFactory
+from inference.glossing import registry
 
 
 LEIPZIG_GLOSSARY = load_glossing_rules("LEIPZIG_GLOSSARY.json")
 
+DEFAULT_CUSTOM_MODEL = "de_dep_news_trf_custom_glossing"
+
+
+def quantize_transformers(nlp):
+    """Swap the PyTorch modules behind any transformer component for int8 dynamic-quantized ones."""
+    import torch
+
+    for name, proc in nlp.pipeline:
+        if "transformer" not in name:
+            continue
+        for node in proc.model.walk():
+            for shim in node.shims:
+                module = getattr(shim, "_model", None)
+                if isinstance(module, torch.nn.Module):
+                    shim._model = torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
 class CustomGlossingStrategy(GlossingStrategy):
-    def __init__(self, language_code: str):
+    def __init__(self, language_code: str, model_ref: str = DEFAULT_CUSTOM_MODEL):
         super().__init__(language_code)
         self.nlp = None
-        self.translation_strategy = TranslationStrategyFactory.get_strategy(language_code)
-        self.translation_strategy.load_model()
+        self.model_ref = model_ref
 
-    def load_model(self, model_name: str = None):
-        model_name = 'de_dep_news_trf_custom_glossing'
-        if model_name is None:
+    def load_model(self, model_ref: str = None):
+        model_ref = model_ref or self.model_ref
+        if model_ref is None:
             raise ValueError("Model name must be provided for loading the custom glossing model.")
-        model_path = Path("training", "glossing", "models", model_name)
-        self.nlp = spacy.load(model_path)
+        entry = registry.resolve(model_ref)
+        if entry.get("language") != self.language_code:
+            raise ValueError(
+                f"Custom glossing model {model_ref!r} is for language {entry.get('language')!r}, "
+                f"not {self.language_code!r}"
+            )
+        start = time.perf_counter()
+        self.nlp = spacy.load(entry["path"])
+        if entry.get("quantize"):
+            quantize_transformers(self.nlp)
+        get_model_store().record_load("custom", f"{entry['name']}@{entry['version']}", time.perf_counter() - start)
         
     def gloss(self, sentence: str) -> str:
         doc = self.nlp(sentence)
+        self.tokens_processed += len(doc)
         glossed_sentence = ""
         for token in doc:
             # skip bracketed/digit tokens
@@ -1,40 +1,68 @@
 import re
-import spacy
 
-from spacy.cli import download
-from spacy.util import is_package
 from utils.functions import load_glossing_rules
+from utils.model_store import load_spacy
 from inference.glossing.abstract import GlossingStrategy
 from inference.translation.factory import TranslationStrategyFactory
 
 
 LEIPZIG_GLOSSARY = load_glossing_rules("LEIPZIG_GLOSSARY.json")
 
+# "accurate" keeps the transformer pipelines, "fast" swaps in the CNN ones.
+MODELS = {
+    "accurate": {
+        "de": "de_dep_news_trf",
+        "uk": "uk_core_news_trf",
+        "ru": "ru_core_news_lg",
+        "en": "en_core_web_trf",
+        "it": "it_core_news_lg",
+    },
+    "fast": {
+        "de": "de_core_news_lg",
+        "uk": "uk_core_news_lg",
+        "ru": "ru_core_news_md",
+        "en": "en_core_web_lg",
+        "it": "it_core_news_md",
+    },
+}
+
+# gloss() only reads lemma_ and morph; the lemmatizers still need the tagger
+# and attribute_ruler, so only the components below are dropped.
+UNUSED_COMPONENTS = ["parser", "ner", "senter", "textcat", "entity_ruler"]
+
+
 class DefaultGlossingStrategy(GlossingStrategy):
-    def __init__(self, language_code: str):
+    def __init__(self, language_code: str, profile: str = "accurate"):
         super().__init__(language_code)
+        if profile not in MODELS:
+            raise ValueError(f"Unknown glossing profile {profile!r}, expected one of {list(MODELS)}")
+        self.profile = profile
         self.nlp = None
-        self.translation_strategy = TranslationStrategyFactory.get_strategy(language_code)
-        self.translation_strategy.load_model()
+        self.translation_strategy = None
 
     def load_model(self):
-        models = {
-            "de": "de_dep_news_trf",
-            "uk": "uk_core_news_trf",
-            "ru": "ru_core_news_lg",
-            "en": "en_core_web_trf",
-            "it": "it_core_news_lg",
-        }
+        models = MODELS[self.profile]
         if self.language_code not in models:
             raise ValueError(f"No default spaCy model registered for {self.language_code!r}")
         model_name = models[self.language_code]
-        if not is_package(model_name):
-            print(f"{model_name} isn’t installed—pulling it down now…")
-            download(model_name)
-        self.nlp = spacy.load(model_name)
+        # the Marian model is shared with Translator runs in the same worker
+        self.translation_strategy = TranslationStrategyFactory.acquire(self.language_code)
+        try:
+            self.nlp = load_spacy(model_name, exclude=UNUSED_COMPONENTS)
+        except BaseException:
+            self.close()
+            raise
+        print(f"Loaded {model_name} ({self.profile}) with components {self.nlp.pipe_names}", flush=True)
+
+    def close(self):
+        """Hand the shared translation strategy back so it can be evicted."""
+        if self.translation_strategy is not None:
+            TranslationStrategyFactory.release(self.translation_strategy)
+            self.translation_strategy = None
 
     def gloss(self, sentence: str) -> str:
         doc = self.nlp(sentence)
+        self.tokens_processed += len(doc)
         glossed_sentence = ""
         for token in doc:
             # skip bracketed/digit tokens
@@ -74,4 +102,4 @@ if __name__ == "__main__":
     glossing_strategy.load_model()
     sentence = "der kürbis und die aubergine ist abgebissen"
     glossed_sentence = glossing_strategy.gloss(sentence)
-    print(glossed_sentence)
\ No newline at end of file
+    print(glossed_sentence)
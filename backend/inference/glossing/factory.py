@@ -1,20 +1,54 @@
+import importlib
+
+from inference.shared import SharedInstances
 from inference.glossing.abstract import GlossingStrategy
-from inference.glossing.default import DefaultGlossingStrategy
-from inference.glossing.japanese import JapaneseGlossingStrategy
-from inference.glossing.vietnamese import VietnameseGlossingStrategy
-from inference.glossing.portuguese import PortugueseGlossingStrategy
+
+# Strategy modules are imported on first use, so a job only pays for the
+# dependencies (spaCy, stanza, deep_translator, ...) of its own language.
+STRATEGIES = {
+    "default": ("inference.glossing.default", "DefaultGlossingStrategy"),
+    "custom": ("inference.glossing.custom", "CustomGlossingStrategy"),
+    "japanese": ("inference.glossing.japanese", "JapaneseGlossingStrategy"),
+    "sudachi": ("inference.glossing.japanese", "SudachiGlossingStrategy"),
+    "vietnamese": ("inference.glossing.vietnamese", "VietnameseGlossingStrategy"),
+    "portuguese": ("inference.glossing.portuguese", "PortugueseGlossingStrategy"),
+}
+
+
+def _strategy_class(name: str):
+    module_name, class_name = STRATEGIES[name]
+    return getattr(importlib.import_module(module_name), class_name)
 
 
 class GlossingStrategyFactory:
+    shared = SharedInstances("glossing", on_drop=lambda strategy: strategy.close())
+
     @staticmethod
-    def get_strategy(language_code: str) -> GlossingStrategy:
+    def get_strategy(language_code: str, profile: str = "accurate", custom_model: str | None = None) -> GlossingStrategy:
+        if custom_model:
+            return _strategy_class("custom")(language_code, custom_model)
         if language_code in ["de", "uk", "ru", "en", "it"]:
-            return DefaultGlossingStrategy(language_code)
+            return _strategy_class("default")(language_code, profile)
         if language_code == "ja":
-            return JapaneseGlossingStrategy(language_code)
+            if profile == "fast":
+                return _strategy_class("sudachi")(language_code)
+            return _strategy_class("japanese")(language_code)
         elif language_code == "vi":
-            return VietnameseGlossingStrategy(language_code)
+            return _strategy_class("vietnamese")(language_code)
         elif language_code == "pt":
-            return PortugueseGlossingStrategy(language_code)
+            return _strategy_class("portuguese")(language_code)
         else:
-            raise ValueError(f"No glossing strategy available for language code: {language_code}")
\ No newline at end of file
+            raise ValueError(f"No glossing strategy available for language code: {language_code}")
+
+    @classmethod
+    def acquire(cls, language_code: str, profile: str = "accurate", custom_model: str | None = None) -> GlossingStrategy:
+        """Return the process-wide, loaded strategy for this language, profile and custom model."""
+        def build():
+            strategy = cls.get_strategy(language_code, profile, custom_model)
+            strategy.load_model()
+            return strategy
+        return cls.shared.acquire((language_code, profile, custom_model), build)
+
+    @classmethod
+    def release(cls, strategy: GlossingStrategy):
+        cls.shared.release(strategy)
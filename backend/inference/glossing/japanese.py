@@ -1,6 +1,5 @@
-import spacy
-from spacy.cli import download
-from spacy.util import is_package
+from tqdm import tqdm
+from utils.model_store import load_spacy
 from inference.glossing.abstract import GlossingStrategy
 
 class JapaneseGlossingStrategy(GlossingStrategy):
@@ -9,16 +8,40 @@ class JapaneseGlossingStrategy(GlossingStrategy):
         self.nlp = None
 
     def load_model(self):
-        model_name = "ja_core_news_trf"
-        if not is_package(model_name):
-            print(f"{model_name} isn’t installed—pulling it down now…")
-            download(model_name)
-        self.nlp = spacy.load(model_name)
+        self.nlp = load_spacy("ja_core_news_trf")
 
     def gloss(self, sentence: str) -> str:
         doc = self.nlp(sentence)
+        self.tokens_processed += len(doc)
         glossed = ""
         for token in doc:
             if token.pos_ != "PUNCT":
                 glossed += f"{token.text}.{token.pos_}.{token.dep_} "
-        return glossed.strip()
\ No newline at end of file
+        return glossed.strip()
+
+class SudachiGlossingStrategy(GlossingStrategy):
+    """
+    Dictionary-based Japanese glossing with SudachiPy. The Sudachi dictionary
+    is loaded once per process and shared by every instance, and
+    gloss_lines() analyses each distinct line of a column only once.
+    """
+    def __init__(self, language_code: str):
+        super().__init__(language_code)
+        self.tokenizer = None
+
+    def load_model(self):
+        # imported here so the transformer strategy does not require sudachipy
+        from utils.japanese_glossing import get_sudachi_tokenizer
+        self.tokenizer = get_sudachi_tokenizer()
+
+    def gloss(self, sentence: str) -> str:
+        from utils.japanese_glossing import SPLIT_MODE, get_sudachi_tokenizer, gloss_sudachi_token
+        tokens = get_sudachi_tokenizer().tokenize(sentence, SPLIT_MODE)
+        self.tokens_processed += len(tokens)
+        glossed = [gloss_sudachi_token(token) for token in tokens if token.part_of_speech()[0] != "補助記号"]
+        return " ".join(glossed)
+
+    def gloss_lines(self, sentences: list[str]) -> list[str]:
+        unique = list(dict.fromkeys(sentences))
+        glossed = {sentence: self.gloss(sentence) for sentence in tqdm(unique, desc="Processing sentences")}
+        return [glossed[sentence] for sentence in sentences]
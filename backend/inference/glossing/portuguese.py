@@ -1,8 +1,6 @@
 import re
-import spacy
-from spacy.cli import download
-from spacy.util import is_package
 from utils.functions import load_glossing_rules
+from utils.model_store import load_spacy
 from deep_translator import GoogleTranslator
 from inference.glossing.abstract import GlossingStrategy
 
@@ -15,11 +13,7 @@ class PortugueseGlossingStrategy(GlossingStrategy):
         self.nlp = None
 
     def load_model(self):
-        model_name = "pt_core_news_lg"
-        if not is_package(model_name):
-            print(f"{model_name} isn’t installed—pulling it down now…")
-            download(model_name)
-        self.nlp = spacy.load(model_name)
+        self.nlp = load_spacy("pt_core_news_lg")
 
     def _clean_portuguese_sentence(self, glossed_sentence: str, lemmatized_sentence: str) -> str:
         """
@@ -58,6 +52,7 @@ class PortugueseGlossingStrategy(GlossingStrategy):
     def gloss(self, sentence: str) -> str:
         # First invoke DefaultGlossStrategy’s logic to get an “uncleaned” gloss
         doc = self.nlp(sentence)
+        self.tokens_processed += len(doc)
         glossed_sentence = ""
         lemmatized_sentence = ""
 
@@ -0,0 +1,143 @@
+"""
+Registry of fine-tuned (custom) glossing models.
+
+Models are registered by name and version into the model store
+(<store>/custom/<name>/<version>) and always loaded from that absolute path:
+
+    python -m inference.glossing.registry register de_custom_glossing \
+        training/glossing/models/de_dep_news_trf_custom_glossing --version 1 --language de --quantize
+    python -m inference.glossing.registry list
+
+A model is referenced as "name" (latest version) or "name@version". Models
+that were never registered fall back to the bundled training/glossing/models
+directory, resolved relative to this file rather than the working directory.
+Names and versions are plain identifiers, so a reference can never point
+outside those two places.
+"""
+
+import re
+import json
+import shutil
+import argparse
+import configparser
+from pathlib import Path
+from datetime import datetime, timezone
+
+from utils.model_store import ModelNotAvailableError, checksum_tree, get_model_store
+
+BUNDLED_MODELS = Path(__file__).resolve().parents[2] / "training" / "glossing" / "models"
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)*$")
+
+
+def registry_path() -> Path:
+    return get_model_store().root / "custom" / "registry.json"
+
+
+def read_registry() -> dict:
+    path = registry_path()
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_registry(registry: dict):
+    path = registry_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(registry, f, indent=2, sort_keys=True)
+    tmp.replace(path)
+
+
+def parse_ref(model_ref: str) -> tuple[str, str | None]:
+    name, _, version = model_ref.partition("@")
+    if not NAME_PATTERN.match(name) or (version and not VERSION_PATTERN.match(version)):
+        raise ModelNotAvailableError(f"Invalid custom glossing model reference {model_ref!r}")
+    return name, version or None
+
+
+def _pipeline_language(path: Path) -> str | None:
+    """The `lang` of a spaCy pipeline, from its config.cfg."""
+    config = configparser.ConfigParser(interpolation=None)
+    try:
+        config.read(path / "config.cfg", encoding="utf-8")
+        return json.loads(config["nlp"]["lang"])
+    except (KeyError, ValueError, configparser.Error):
+        return None
+
+
+def resolve(model_ref: str) -> dict:
+    """Return the registry entry (with an absolute "path") for name[@version]."""
+    name, version = parse_ref(model_ref)
+    entry = read_registry().get(name)
+    if entry is None:
+        bundled = (BUNDLED_MODELS / name).resolve()
+        if version is None and bundled.parent == BUNDLED_MODELS and (bundled / "config.cfg").exists():
+            return {"name": name, "version": "bundled", "path": str(bundled), "quantize": False,
+                    "language": _pipeline_language(bundled)}
+        raise ModelNotAvailableError(f"Custom glossing model {model_ref!r} is not registered")
+
+    version = version or entry["latest"]
+    if version not in entry["versions"]:
+        raise ModelNotAvailableError(f"Custom glossing model {name!r} has no version {version!r}")
+    return {"name": name, "version": version, **entry["versions"][version]}
+
+
+def register(name: str, source: str, version: str, language: str, quantize: bool = False) -> dict:
+    """Copy a trained spaCy pipeline into the store under name/version."""
+    parse_ref(f"{name}@{version}")
+    source = Path(source).resolve()
+    if not (source / "config.cfg").exists():
+        raise ValueError(f"{source} is not a spaCy pipeline directory")
+
+    dest = get_model_store().root / "custom" / name / version
+    if dest.exists():
+        shutil.rmtree(dest)
+    shutil.copytree(source, dest)
+    sha256, size, _ = checksum_tree(dest)
+
+    registry = read_registry()
+    entry = registry.setdefault(name, {"versions": {}})
+    entry["versions"][version] = {
+        "path": str(dest),
+        "language": language,
+        "quantize": quantize,
+        "sha256": sha256,
+        "size": size,
+        "registered_at": datetime.now(timezone.utc).isoformat(),
+    }
+    entry["latest"] = version
+    _write_registry(registry)
+    return entry["versions"][version]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Register fine-tuned glossing models")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    reg = sub.add_parser("register", help="copy a trained pipeline into the registry")
+    reg.add_argument("name")
+    reg.add_argument("source", help="directory of the trained spaCy pipeline")
+    reg.add_argument("--version", required=True)
+    reg.add_argument("--language", required=True)
+    reg.add_argument("--quantize", action="store_true",
+                     help="run the transformer with int8 dynamic quantization")
+
+    sub.add_parser("list", help="list registered models")
+
+    args = parser.parse_args()
+    if args.command == "register":
+        entry = register(args.name, args.source, args.version, args.language, args.quantize)
+        print(f"Registered {args.name}@{args.version} at {entry['path']}")
+    elif args.command == "list":
+        for name, entry in sorted(read_registry().items()):
+            for version, info in sorted(entry["versions"].items()):
+                latest = " (latest)" if version == entry["latest"] else ""
+                quant = " int8" if info["quantize"] else ""
+                print(f"{name}@{version}{latest} [{info['language']}{quant}] {info['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,7 @@
 import re
-import stanza
-import spacy_stanza
-from spacy.cli import download
-from spacy.util import is_package
 from inference.glossing.abstract import GlossingStrategy
 from utils.functions import load_glossing_rules
+from utils.model_store import load_stanza_pipeline
 
 from deep_translator import GoogleTranslator
 class VietnameseGlossingStrategy(GlossingStrategy):
@@ -15,14 +12,14 @@ class VietnameseGlossingStrategy(GlossingStrategy):
         self.VI_OVERRIDES = load_glossing_rules("vietnamese.json")
 
     def load_model(self):
-        stanza.download(self.language_code)
-        self.nlp = spacy_stanza.load_pipeline(self.language_code)
+        self.nlp = load_stanza_pipeline(self.language_code)
 
     def clean_vietnamese_lemma(self, lemma: str):
         return self.VI_OVERRIDES.get(lemma, None)
 
     def gloss(self, sentence: str) -> str:
         doc = self.nlp(sentence)
+        self.tokens_processed += len(doc)
         glossed = ""
         for token in doc: 
             if re.search(r"[\(\[\]\)\d]", token.text):
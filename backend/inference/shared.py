@@ -0,0 +1,100 @@
+import os
+import logging
+import threading
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Keep released instances loaded so later sessions/jobs in this worker reuse them.
+KEEP_WARM = os.getenv("TGT_KEEP_WARM", "1") != "0"
+
+
+class SharedInstances:
+    """
+    Process-scoped cache of expensive objects (strategies with loaded models).
+
+    Instances are built lazily on the first acquire() for a key, handed out to
+    every later caller with the same key and reference counted. When the count
+    drops to zero they stay loaded (unless TGT_KEEP_WARM=0) so the next session
+    or job in the same worker does not reload them. `on_drop(instance)` is
+    called when an instance is evicted, e.g. to release what it acquired from
+    another SharedInstances.
+    """
+
+    def __init__(self, name: str, on_drop=None):
+        self.name = name
+        self.on_drop = on_drop
+        self._lock = threading.Lock()
+        self._instances: dict[tuple, object] = {}
+        self._refcounts: dict[tuple, int] = {}
+        self._keys_by_id: dict[int, tuple] = {}
+        self._build_locks: dict[tuple, threading.Lock] = {}
+        self.builds = 0
+        self.hits = 0
+
+    def acquire(self, key: tuple, build):
+        with self._lock:
+            if key in self._instances:
+                self._refcounts[key] += 1
+                self.hits += 1
+                metrics.inc("tgt_model_cache_requests_total", cache=self.name, result="hit")
+                return self._instances[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # build outside the global lock so different keys load concurrently
+        with build_lock:
+            with self._lock:
+                if key in self._instances:
+                    self._refcounts[key] += 1
+                    self.hits += 1
+                    metrics.inc("tgt_model_cache_requests_total", cache=self.name, result="hit")
+                    return self._instances[key]
+            logger.info(f"Building shared {self.name} instance for {key}")
+            with metrics.timed("tgt_model_load_seconds", model=self.name):
+                instance = build()
+            metrics.inc("tgt_model_cache_requests_total", cache=self.name, result="build")
+            with self._lock:
+                self._instances[key] = instance
+                self._refcounts[key] = 1
+                self._keys_by_id[id(instance)] = key
+                self.builds += 1
+            return instance
+
+    def release(self, instance, evict: bool = not KEEP_WARM):
+        dropped = []
+        with self._lock:
+            key = self._keys_by_id.get(id(instance))
+            if key is None:
+                return
+            self._refcounts[key] = max(0, self._refcounts[key] - 1)
+            if evict and self._refcounts[key] == 0:
+                dropped.append(self._drop(key))
+        self._dropped(dropped)
+
+    def clear_idle(self):
+        """Drop every instance nobody currently holds."""
+        with self._lock:
+            dropped = [self._drop(key) for key in [k for k, n in self._refcounts.items() if n == 0]]
+        self._dropped(dropped)
+
+    def _drop(self, key: tuple):
+        instance = self._instances.pop(key)
+        self._refcounts.pop(key)
+        self._keys_by_id.pop(id(instance), None)
+        logger.info(f"Evicted shared {self.name} instance for {key}")
+        return instance
+
+    def _dropped(self, instances):
+        # outside self._lock: on_drop may release into another SharedInstances
+        if self.on_drop is not None:
+            for instance in instances:
+                self.on_drop(instance)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "builds": self.builds,
+                "hits": self.hits,
+                "instances": {repr(key): count for key, count in self._refcounts.items()},
+            }
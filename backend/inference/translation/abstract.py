@@ -2,10 +2,10 @@
 
 import os
 import sys
+import threading
 from abc import ABC, abstractmethod
 
-import deepl
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+from utils.model_store import load_hf
 
 
 class TranslationStrategy(ABC):
@@ -17,6 +17,9 @@ class TranslationStrategy(ABC):
         self._marian_tokenizer = None
         self._deepl_client = None
         self._deepl_source_lang = None
+        # one strategy serves every session of a worker; the Marian tokenizer
+        # must not be called from several threads at once
+        self.lock = threading.Lock()
 
 
     def _init_marian_model(self):
@@ -24,11 +27,15 @@ class TranslationStrategy(ABC):
         Attempt to load a MarianMT model for <language_code>→en.
         If it fails, _marian_model and _marian_tokenizer stay as None.
         """
+        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
         model_name = f"Helsinki-NLP/opus-mt-{self.language_code}-en"
-        self._marian_tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self._marian_model = (
-            AutoModelForSeq2SeqLM.from_pretrained(model_name)
-            .to(self.device)
+        self._marian_tokenizer, self._marian_model = load_hf(
+            model_name,
+            lambda path: (
+                AutoTokenizer.from_pretrained(path),
+                AutoModelForSeq2SeqLM.from_pretrained(path).to(self.device),
+            ),
         )
 
     def _init_deepl_client(self):
@@ -38,6 +45,7 @@ class TranslationStrategy(ABC):
         """
         base_path = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
         secrets_path = os.path.join(base_path, "materials", "secrets.env")
+        import deepl
         from dotenv import load_dotenv
         load_dotenv(secrets_path, override=True)
         api_key = os.getenv("DEEPL_API_KEY")
@@ -63,17 +71,18 @@ class TranslationStrategy(ABC):
             )
 
         try:
-            inputs = self._marian_tokenizer(
-                text,
-                return_tensors="pt",
-                padding=True,
-                truncation=True
-            ).to(self.device)
-
-            tokens = self._marian_model.generate(**inputs)
-            decoded = self._marian_tokenizer.batch_decode(
-                tokens, skip_special_tokens=True
-            )[0]
+            with self.lock:
+                inputs = self._marian_tokenizer(
+                    text,
+                    return_tensors="pt",
+                    padding=True,
+                    truncation=True
+                ).to(self.device)
+
+                tokens = self._marian_model.generate(**inputs)
+                decoded = self._marian_tokenizer.batch_decode(
+                    tokens, skip_special_tokens=True
+                )[0]
             return decoded
         except Exception:
             return None
@@ -88,6 +97,7 @@ class TranslationStrategy(ABC):
                 "DeepL client not initialized. "
                 "Call _init_deepl_client() before translating."
             )
+        import deepl
 
         try:
             # First try explicit source_lang; if that fails, let DeepL auto-detect
@@ -1,11 +1,29 @@
+from inference.shared import SharedInstances
 from inference.translation.abstract import TranslationStrategy
 from inference.translation.default import DefaultTranslationStrategy
 
+MARIAN_LANGUAGES = ["de", "uk", "ru", "en", "it"]
+
 
 class TranslationStrategyFactory:
+    shared = SharedInstances("translation")
+
     @staticmethod
-    def get_strategy(language_code: str) -> TranslationStrategy:
-        if language_code in ["de", "uk", "ru", "en", "it"]:
-            return DefaultTranslationStrategy(language_code)
+    def get_strategy(language_code: str, device: str = "cpu") -> TranslationStrategy:
+        if language_code in MARIAN_LANGUAGES:
+            return DefaultTranslationStrategy(language_code, device)
         else:
             raise ValueError(f"No translation strategy available for language code: {language_code}")
+
+    @classmethod
+    def acquire(cls, language_code: str, device: str = "cpu") -> TranslationStrategy:
+        """Return the process-wide, loaded strategy for this language and device."""
+        def build():
+            strategy = cls.get_strategy(language_code, device)
+            strategy.load_model()
+            return strategy
+        return cls.shared.acquire((language_code, device), build)
+
+    @classmethod
+    def release(cls, strategy: TranslationStrategy):
+        cls.shared.release(strategy)
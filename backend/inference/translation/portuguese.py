@@ -23,9 +23,10 @@ class PortugueseTranslationStrategy(TranslationStrategy):
  
     def translate(self, text: str) -> str | None:
         try:
-            inputs = self._marian_tokenizer([text], return_tensors="pt", padding=True, truncation=True).to(self.device)
-            outputs = self._marian_model.generate(**inputs)
-            return self._marian_tokenizer.batch_decode(outputs, skip_special_tokens=True)[0]
+            with self.lock:
+                inputs = self._marian_tokenizer([text], return_tensors="pt", padding=True, truncation=True).to(self.device)
+                outputs = self._marian_model.generate(**inputs)
+                return self._marian_tokenizer.batch_decode(outputs, skip_special_tokens=True)[0]
         except Exception as e:
             print(f"[PortugueseTranslationStrategy] Marian translation failed: {e}")
 
@@ -19,3 +19,11 @@ class TransliterationStrategy(ABC):
         Must be implemented by every subclass.
         """
         raise NotImplementedError("Subclasses must implement transliterate()")
+
+    def transliterate_batch(self, sentences: list[str]) -> list[str]:
+        """
+        Transliterate a whole column. The default calls transliterate() once
+        per distinct sentence; engines with a faster bulk path override it.
+        """
+        results = {sentence: self.transliterate(sentence) for sentence in dict.fromkeys(sentences)}
+        return [results[sentence] for sentence in sentences]
@@ -1,24 +1,78 @@
+import os
+import re
+import multiprocessing
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
 from pypinyin import lazy_pinyin, Style
 from inference.transliteration.abstract import TransliterationStrategy
 
+# Per-job tone styles. "default" keeps the historical output (style=None).
+STYLES = {
+    "default": None,
+    "tone": Style.TONE,
+    "tone2": Style.TONE2,
+    "tone3": Style.TONE3,
+    "normal": Style.NORMAL,
+}
+
+# Runs of Han characters; everything between them is passed through as one
+# item, exactly like lazy_pinyin(errors='default') does.
+HAN_RUN = re.compile(r"([〇㐀-䶿一-鿿豈-﫿\U00020000-\U0002ebef\U00030000-\U0003134f]+)")
+
+# Inputs with at least this many distinct sentences are sharded over processes.
+PARALLEL_THRESHOLD = int(os.getenv("TGT_PINYIN_PARALLEL_THRESHOLD", "5000"))
+
+
+@lru_cache(maxsize=200_000)
+def _phrase_pinyin(phrase: str, style) -> tuple[str, ...]:
+    return tuple(lazy_pinyin(phrase, style=style, errors='default', strict=False))
+
+
+def _sentence_pinyin(sentence: str, style) -> str:
+    items = []
+    for i, part in enumerate(HAN_RUN.split(sentence)):
+        if not part:
+            continue
+        if i % 2:
+            items.extend(_phrase_pinyin(part, style))
+        else:
+            items.append(part)
+    text = ' '.join(items)
+    text = text.replace('  ', ' ')
+    return text
+
+
+def _pinyin_chunk(args) -> list[str]:
+    sentences, style = args
+    return [_sentence_pinyin(sentence, style) for sentence in sentences]
+
+
 class ChineseStrategy(TransliterationStrategy):
-    def __init__(self):
+    def __init__(self, style: str | None = None):
         # Choose pinyin style: TONE2 (Tone after syllable), TONE3 (tone after word), etc. 
-        self.style = None
+        if style not in (None, *STYLES):
+            raise ValueError(f"Unknown pinyin style {style!r}, expected one of {list(STYLES)}")
+        self.style = STYLES[style or "default"]
 
     def transliterate(self, sentence: str) -> str:
-        # Use lazy_pinyin for simple local transliteration
-        # It handles non-Chinese characters by returning them unchanged
-
-        pinyin_list = lazy_pinyin(
-            sentence,
-            style=self.style,
-            errors='default',
-            strict=False
-        )
-        text = ' '.join(pinyin_list)
-        text = text.replace('  ', ' ')
-        return text
+        # Use lazy_pinyin for simple local transliteration, memoized per
+        # Han phrase. Non-Chinese characters are returned unchanged.
+        return _sentence_pinyin(sentence, self.style)
+
+    def transliterate_batch(self, sentences: list[str]) -> list[str]:
+        unique = list(dict.fromkeys(sentences))
+        workers = os.cpu_count() or 1
+        # daemonic job processes may not start children, so stay serial there
+        if len(unique) < PARALLEL_THRESHOLD or workers < 2 or multiprocessing.current_process().daemon:
+            results = _pinyin_chunk((unique, self.style))
+        else:
+            size = -(-len(unique) // (workers * 4))
+            chunks = [(unique[i:i + size], self.style) for i in range(0, len(unique), size)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = [text for chunk in pool.map(_pinyin_chunk, chunks) for text in chunk]
+        pinyin = dict(zip(unique, results))
+        return [pinyin[sentence] for sentence in sentences]
     
 
 if __name__ == "__main__":
@@ -26,4 +80,4 @@ if __name__ == "__main__":
     strategy = ChineseStrategy()
     example_sentence = "目前，中华人民共和国为世界第二大经济体，2023年國內生產總值（GDP）总量达129.4万亿人民币，依國際匯率折合18.37万亿美元，位居世界第二，仅次于美国；按購買力平價则位列世界第一"
     transliterated = strategy.transliterate(example_sentence)
-    print(transliterated)
\ No newline at end of file
+    print(transliterated)
@@ -1,12 +1,55 @@
+import importlib
+
+from inference.shared import SharedInstances
 from inference.transliteration.abstract import TransliterationStrategy
-from inference.transliteration.japanese import JapaneseStrategy
-from inference.transliteration.chinese import ChineseStrategy
+
+# language -> engine -> (module, class); the first engine listed is the default.
+# Modules are imported on first use, so a job only pays for the dependencies
+# of the language (and engine) it asked for.
+ENGINES = {
+    "zh": {"pypinyin": ("inference.transliteration.chinese", "ChineseStrategy")},
+    "ja": {
+        "spacy": ("inference.transliteration.japanese", "JapaneseStrategy"),
+        "sudachi": ("inference.transliteration.japanese", "SudachiJapaneseStrategy"),
+    },
+    "ru": {"translit": ("inference.transliteration.russian", "RussianStrategy")},
+    "uk": {"translit": ("inference.transliteration.ukrainian", "UkrainianStrategy")},
+}
+
+# languages whose engines take an output style (e.g. the pinyin tone style)
+STYLED = {"zh"}
+
 
 class TransliterationStrategyFactory:
+    shared = SharedInstances("transliteration")
+
     @staticmethod
-    def get_strategy(language_code: str) -> TransliterationStrategy:
-        if language_code == "zh":
-            return ChineseStrategy()
-        else:
+    def available_engines() -> dict[str, list[str]]:
+        return {language: list(engines) for language, engines in ENGINES.items()}
+
+    @staticmethod
+    def get_strategy(language_code: str, engine: str | None = None, style: str | None = None) -> TransliterationStrategy:
+        engines = ENGINES.get(language_code)
+        if engines is None:
             raise ValueError(f"No transliteration strategy available for language code: {language_code}")
-            
+        engine = engine or next(iter(engines))
+        if engine not in engines:
+            raise ValueError(
+                f"No transliteration engine {engine!r} for language code {language_code}; "
+                f"available: {list(engines)}"
+            )
+        module_name, class_name = engines[engine]
+        strategy_cls = getattr(importlib.import_module(module_name), class_name)
+        return strategy_cls(style) if language_code in STYLED else strategy_cls()
+
+    @classmethod
+    def acquire(cls, language_code: str, engine: str | None = None, style: str | None = None) -> TransliterationStrategy:
+        """Return the process-wide strategy for this language, engine and style, built on first use."""
+        return cls.shared.acquire(
+            (language_code, engine, style),
+            lambda: cls.get_strategy(language_code, engine, style),
+        )
+
+    @classmethod
+    def release(cls, strategy: TransliterationStrategy):
+        cls.shared.release(strategy)
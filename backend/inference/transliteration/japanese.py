@@ -1,24 +1,82 @@
+import threading
+
 from inference.transliteration.abstract import TransliterationStrategy
-import spacy
 import pykakasi
+from utils.model_store import load_spacy
+
+PUNCTUATION = {"、": ",", "。": "."}
+
 
 class JapaneseStrategy(TransliterationStrategy):
     def __init__(self):
         # Load heavy models once
-        self.nlp = spacy.load('ja_core_news_trf')
+        self.nlp = load_spacy('ja_core_news_trf')
         self.kks = pykakasi.kakasi()
+        # shared by the sessions of a worker; neither spaCy nor pykakasi is thread-safe
+        self.lock = threading.Lock()
 
     def transliterate(self, sentence: str) -> str:
-        doc = self.nlp(sentence)
+        with self.lock:
+            return self._romanize_doc(self.nlp(sentence))
+
+    def transliterate_batch(self, sentences: list[str]) -> list[str]:
+        unique = list(dict.fromkeys(sentences))
+        with self.lock:
+            romaji = {doc.text: self._romanize_doc(doc) for doc in self.nlp.pipe(unique, batch_size=64)}
+        return [romaji[sentence] for sentence in sentences]
+
+    def _romanize_doc(self, doc) -> str:
         romaji = []
         for word in doc:
             if word.text.isascii():
                 romaji.append(word.text)
-            elif word.text in ("、", "。"):
-                romaji.append({"、": ",", "。": "."}[word.text])
+            elif word.text in PUNCTUATION:
+                romaji.append(PUNCTUATION[word.text])
             else:
                 kana = word.morph.to_dict().get('Reading', word.text)
-                conv = self.kks.convert(kana)
-                hepburn = " ".join(item['hepburn'] for item in conv)
-                romaji.append(hepburn)
-        return " ".join(romaji)
\ No newline at end of file
+                romaji.append(" ".join(item['hepburn'] for item in self.kks.convert(kana)))
+        return " ".join(romaji)
+
+
+class SudachiJapaneseStrategy(TransliterationStrategy):
+    """
+    Romanization without the transformer pipeline: readings come straight from
+    the Sudachi dictionary (the same analyzer spaCy's Japanese tokenizer uses,
+    in the same split mode), and the pykakasi conversion of each
+    (surface, reading) pair is cached.
+    """
+    def __init__(self):
+        from sudachipy import tokenizer as japanese_tokenizer
+        from utils.japanese_glossing import get_sudachi_dictionary
+
+        get_sudachi_dictionary()
+        self.split_mode = japanese_tokenizer.Tokenizer.SplitMode.A
+        self.kks = pykakasi.kakasi()
+        # tokenizers are per thread (get_sudachi_tokenizer); pykakasi is shared
+        self.lock = threading.Lock()
+        self._romaji_cache: dict[tuple[str, str], str] = {}
+
+    def _romanize_token(self, surface: str, reading: str) -> str:
+        key = (surface, reading)
+        romaji = self._romaji_cache.get(key)
+        if romaji is None:
+            if surface.isascii():
+                romaji = surface
+            elif surface in PUNCTUATION:
+                romaji = PUNCTUATION[surface]
+            else:
+                with self.lock:
+                    converted = self.kks.convert(reading or surface)
+                romaji = " ".join(item['hepburn'] for item in converted)
+            self._romaji_cache[key] = romaji
+        return romaji
+
+    def transliterate(self, sentence: str) -> str:
+        from utils.japanese_glossing import get_sudachi_tokenizer
+
+        romaji = [
+            self._romanize_token(token.surface(), token.reading_form())
+            for token in get_sudachi_tokenizer().tokenize(sentence, self.split_mode)
+            if token.surface().strip()
+        ]
+        return " ".join(romaji)
@@ -2,5 +2,8 @@ from inference.transliteration.abstract import TransliterationStrategy
 from transliterate import translit
 
 class RussianStrategy(TransliterationStrategy):
+    def __init__(self):
+        super().__init__("ru")
+
     def transliterate(self, sentence: str) -> str:
-        return translit(sentence, 'ru', reversed=True)
\ No newline at end of file
+        return translit(sentence, 'ru', reversed=True)
@@ -0,0 +1,9 @@
+from inference.transliteration.abstract import TransliterationStrategy
+from transliterate import translit
+
+class UkrainianStrategy(TransliterationStrategy):
+    def __init__(self):
+        super().__init__("uk")
+
+    def transliterate(self, sentence: str) -> str:
+        return translit(sentence, 'uk', reversed=True)
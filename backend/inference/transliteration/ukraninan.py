@@ -1,3 +0,0 @@
-class UkrainianStrategy(TransliterationStrategy):
-    def transliterate(self, sentence: str) -> str:
-        return translit(sentence, 'uk', reversed=True)
\ No newline at end of file
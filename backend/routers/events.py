@@ -0,0 +1,172 @@
+"""
+Asyncio bridge between the job store's event logs and SSE clients.
+
+Each watched job has one reader task that fetches new events from the job
+store and fans them out to every subscriber of that job, so a stream costs a
+small asyncio.Queue rather than a threadpool thread. The reader wakes up right
+away when this process's worker pool records an event (notify) and polls
+every POLL_INTERVAL seconds for events written by other API processes.
+
+Subscriber queues are bounded: a client that falls BUFFER events behind stops
+receiving from the reader and catches up from the durable log instead.
+Streams carry `id:` lines so EventSource reconnects resume via Last-Event-ID,
+and send a comment every HEARTBEAT seconds to keep idle connections open.
+"""
+
+import asyncio
+import logging
+
+from .job_store import JobStore, FINISHED
+from utils.progress import is_final
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+HEARTBEAT = 15.0
+BUFFER = 1000
+RETRY_MS = 3000
+
+
+def format_sse(seq: int, message: str) -> bytes:
+    """One SSE event; multi-line messages (tracebacks) become several data lines."""
+    data = "\n".join(f"data: {line}" for line in message.split("\n"))
+    return f"id: {seq}\n{data}\n\n".encode("utf-8")
+
+
+class _Subscriber:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=BUFFER)
+        self.lagged = False
+
+
+class _Reader:
+    def __init__(self, bridge, job_id):
+        self.bridge = bridge
+        self.job_id = job_id
+        self.subscribers: set[_Subscriber] = set()
+        self.wake = asyncio.Event()
+        self.after = -1
+        self.finished = False
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        store = self.bridge.store
+        try:
+            while self.subscribers and not self.finished:
+                events = await asyncio.to_thread(store.events, self.job_id, self.after)
+                for seq, message in events:
+                    self.after = seq
+                    self.finished = self.finished or is_final(message)
+                    for sub in self.subscribers:
+                        if sub.lagged:
+                            continue
+                        try:
+                            sub.queue.put_nowait((seq, message))
+                        except asyncio.QueueFull:
+                            sub.lagged = True
+                if not events:
+                    job = await asyncio.to_thread(store.get, self.job_id)
+                    if job is None or job["status"] in FINISHED:
+                        # a closing event stored after our read is still delivered
+                        if await asyncio.to_thread(store.events, self.job_id, self.after):
+                            continue
+                        self.finished = True
+                if self.finished:
+                    break
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        except Exception:
+            logger.exception(f"Event reader for job {self.job_id} failed")
+            self.finished = True
+        finally:
+            for sub in self.subscribers:
+                try:
+                    sub.queue.put_nowait(None)
+                except asyncio.QueueFull:
+                    sub.lagged = True
+            if self.bridge._readers.get(self.job_id) is self:
+                del self.bridge._readers[self.job_id]
+
+
+class EventBridge:
+    def __init__(self, store: JobStore | None = None):
+        self._store = store
+        self._readers: dict[str, _Reader] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            from .job_store import get_job_store
+            self._store = get_job_store()
+        return self._store
+
+    def notify(self, job_id: str):
+        """Wake the job's reader; safe to call from any thread."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake, job_id)
+
+    def _wake(self, job_id):
+        reader = self._readers.get(job_id)
+        if reader is not None:
+            reader.wake.set()
+
+    async def subscribe(self, job_id: str, after: int = -1):
+        """Yield SSE-encoded events of a job after offset `after`, until the job is done."""
+        self._loop = asyncio.get_running_loop()
+        sub = _Subscriber()
+        reader = self._readers.get(job_id)
+        if reader is None or reader.finished:
+            reader = self._readers[job_id] = _Reader(self, job_id)
+        reader.subscribers.add(sub)
+
+        yield f"retry: {RETRY_MS}\n\n".encode("utf-8")
+        try:
+            last = after
+            # replay the log first; later only when this client lagged or the reader stopped
+            catch_up = True
+            while True:
+                if catch_up or sub.lagged:
+                    catch_up = False
+                    sub.lagged = False
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    for seq, message in await asyncio.to_thread(self.store.events, job_id, last):
+                        last = seq
+                        yield format_sse(seq, message)
+                        if is_final(message):
+                            return
+                    if reader.finished:
+                        return
+
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if item is None:
+                    # the reader stopped; whatever it did not deliver is in the log
+                    catch_up = True
+                    continue
+                seq, message = item
+                if seq <= last:
+                    continue
+                last = seq
+                yield format_sse(seq, message)
+                if is_final(message):
+                    return
+        finally:
+            reader.subscribers.discard(sub)
+
+    def stats(self) -> dict:
+        return {
+            "jobs": len(self._readers),
+            "subscribers": sum(len(r.subscribers) for r in self._readers.values()),
+        }
+
+
+bridge = EventBridge()
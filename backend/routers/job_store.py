@@ -0,0 +1,322 @@
+"""
+Durable job state shared by every API process on the host.
+
+A job store keeps each job's metadata, status, result locations and an
+append-only event log (the JSON-encoded ProgressEvents a job streams to the
+client, numbered from 0). `/jobs/{id}/stream` replays the log from any offset, so a client can
+reconnect to any uvicorn worker, and a restart does not lose finished jobs.
+
+Every job records the pid of the API process that owns it. On startup jobs
+whose owner is gone are recovered: queued ones are requeued in the new
+process, running ones are marked interrupted.
+
+Jobs are started through admit(), which picks and marks the next job inside
+one write transaction, so the scheduler's per-action caps, memory check and
+queue limit hold for all API processes together rather than per process.
+
+The store is chosen with TGT_JOB_STORE; only SQLite ships:
+
+    TGT_JOB_STORE=sqlite:////var/lib/tgt/jobs.sqlite3   (default backend/data/jobs.sqlite3)
+"""
+
+import os
+import json
+import time
+import sqlite3
+from abc import ABC, abstractmethod
+from pathlib import Path
+from functools import lru_cache
+
+from utils.progress import ProgressEvent
+
+DEFAULT_DB = Path(__file__).resolve().parent.parent / "data" / "jobs.sqlite3"
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, INTERRUPTED = (
+    "queued", "running", "done", "failed", "cancelled", "interrupted"
+)
+FINISHED = (DONE, FAILED, CANCELLED, INTERRUPTED)
+
+
+class JobStore(ABC):
+    """Interface every job store backend implements."""
+
+    @abstractmethod
+    def create(self, job_id: str, kind: str, action: str, user: str, params: dict, priority: int = 0):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, job_id: str) -> dict | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, job_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def append_event(self, job_id: str, message: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def events(self, job_id: str, after: int = -1) -> list[tuple[int, str]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def request_cancel(self, job_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def cancel_requested(self, job_ids: list[str]) -> list[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def recover(self) -> list[dict]:
+        """Interrupt running jobs of dead owners and claim their queued jobs for this process."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def counts(self) -> list[tuple[str, str, int]]:
+        """(action, status, number of jobs) for every combination present."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def running(self) -> list[dict]:
+        """Running jobs of live owners, in any API process on the host."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def waiting(self, exclude: str | None = None) -> int:
+        """Number of queued jobs of live owners, in any API process on the host."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def admit(self, choose) -> str | None:
+        """
+        Atomically start the job `choose(running())` returns the id of (or
+        None); no other process starts a job in between.
+        """
+        raise NotImplementedError
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SQLiteJobStore(JobStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id       TEXT PRIMARY KEY,
+            kind         TEXT NOT NULL,
+            action       TEXT NOT NULL,
+            user         TEXT NOT NULL,
+            priority     INTEGER NOT NULL DEFAULT 0,
+            params       TEXT,
+            status       TEXT NOT NULL,
+            owner        INTEGER NOT NULL,
+            cancel       INTEGER NOT NULL DEFAULT 0,
+            results      TEXT,
+            base_dir     TEXT,
+            created_at   REAL NOT NULL,
+            started_at   REAL,
+            finished_at  REAL
+        );
+        CREATE TABLE IF NOT EXISTS events (
+            job_id   TEXT NOT NULL,
+            seq      INTEGER NOT NULL,
+            message  TEXT NOT NULL,
+            at       REAL NOT NULL,
+            PRIMARY KEY (job_id, seq)
+        );
+    """
+    COLUMNS = ("status", "owner", "cancel", "results", "base_dir", "params", "started_at", "finished_at")
+    JSON_COLUMNS = ("params", "results")
+
+    def __init__(self, path: str | os.PathLike = DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(self.SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            if "results" not in columns:
+                # stores created before results replaced the zip path
+                db.execute("ALTER TABLE jobs ADD COLUMN results TEXT")
+
+    def _connect(self):
+        # one short-lived connection per call: safe across threads and processes
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return _Connection(db)
+
+    def create(self, job_id, kind, action, user, params, priority=0):
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (job_id, kind, action, user, priority, params, status, owner, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, action, user, priority, json.dumps(params), QUEUED, os.getpid(), time.time()),
+            )
+
+    def get(self, job_id):
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for name in self.JSON_COLUMNS:
+            job[name] = json.loads(job[name]) if job[name] else None
+        return job
+
+    def update(self, job_id, **fields):
+        unknown = set(fields) - set(self.COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown job fields {sorted(unknown)}")
+        if fields.get("status") in FINISHED:
+            # parameters can hold an access token; keep them only while needed
+            fields.setdefault("finished_at", time.time())
+            fields.setdefault("params", None)
+        elif fields.get("status") == RUNNING:
+            fields.setdefault("started_at", time.time())
+        for name in self.JSON_COLUMNS:
+            if fields.get(name) is not None:
+                fields[name] = json.dumps(fields[name])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def delete(self, job_id):
+        with self._connect() as db:
+            db.execute("DELETE FROM events WHERE job_id = ?", (job_id,))
+            db.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def append_event(self, job_id, message):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            seq = db.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            db.execute(
+                "INSERT INTO events (job_id, seq, message, at) VALUES (?, ?, ?, ?)",
+                (job_id, seq, message, time.time()),
+            )
+            db.execute("COMMIT")
+        return seq
+
+    def events(self, job_id, after=-1):
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT seq, message FROM events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+            ).fetchall()
+        return [(row["seq"], row["message"]) for row in rows]
+
+    def request_cancel(self, job_id):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET cancel = 1 WHERE job_id = ?", (job_id,))
+
+    def cancel_requested(self, job_ids):
+        if not job_ids:
+            return []
+        marks = ", ".join("?" for _ in job_ids)
+        with self._connect() as db:
+            rows = db.execute(
+                f"SELECT job_id FROM jobs WHERE cancel = 1 AND job_id IN ({marks})", tuple(job_ids)
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def counts(self):
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT action, status, COUNT(*) AS n FROM jobs GROUP BY action, status ORDER BY action, status"
+            ).fetchall()
+        return [(row["action"], row["status"], row["n"]) for row in rows]
+
+    def _running(self, db) -> list[dict]:
+        rows = db.execute("SELECT * FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+        jobs = [dict(row) for row in rows if _pid_alive(row["owner"])]
+        for job in jobs:
+            for name in self.JSON_COLUMNS:
+                job[name] = json.loads(job[name]) if job[name] else None
+        return jobs
+
+    def running(self):
+        with self._connect() as db:
+            return self._running(db)
+
+    def waiting(self, exclude=None):
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT owner, COUNT(*) AS n FROM jobs WHERE status = ? AND job_id != ? GROUP BY owner",
+                (QUEUED, exclude or ""),
+            ).fetchall()
+        return sum(row["n"] for row in rows if _pid_alive(row["owner"]))
+
+    def admit(self, choose):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            job_id = choose(self._running(db))
+            if job_id is not None:
+                db.execute(
+                    "UPDATE jobs SET status = ?, started_at = ? WHERE job_id = ?", (RUNNING, time.time(), job_id)
+                )
+            db.execute("COMMIT")
+        return job_id
+
+    def recover(self):
+        me = os.getpid()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) AND owner != ?", (QUEUED, RUNNING, me)
+            ).fetchall()
+            orphans = [dict(row) for row in rows if not _pid_alive(row["owner"])]
+            requeued = []
+            for job in orphans:
+                if job["status"] == QUEUED and job["params"] and not job["cancel"]:
+                    db.execute("UPDATE jobs SET owner = ? WHERE job_id = ?", (me, job["job_id"]))
+                    job["params"] = json.loads(job["params"])
+                    requeued.append(job)
+                else:
+                    db.execute(
+                        "UPDATE jobs SET status = ?, params = NULL, finished_at = ? WHERE job_id = ?",
+                        (INTERRUPTED, time.time(), job["job_id"]),
+                    )
+            db.execute("COMMIT")
+
+        for job in orphans:
+            if job not in requeued:
+                self.append_event(job["job_id"], ProgressEvent("error", message="Job interrupted by a server restart").to_json())
+                self.append_event(job["job_id"], ProgressEvent("done").to_json())
+        return requeued
+
+
+class _Connection:
+    """Context manager that closes the sqlite3 connection (sqlite3's own only commits)."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None and self.db.in_transaction:
+            self.db.execute("ROLLBACK")
+        self.db.close()
+
+
+@lru_cache(maxsize=None)
+def get_job_store() -> JobStore:
+    url = os.getenv("TGT_JOB_STORE", f"sqlite:///{DEFAULT_DB}")
+    scheme, _, location = url.partition("://")
+    if scheme == "sqlite":
+        # sqlite:///relative/path, sqlite:////absolute/path
+        return SQLiteJobStore(location[1:] if location.startswith("/") else location)
+    raise ValueError(f"Unsupported job store {url!r}")
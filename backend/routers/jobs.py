@@ -1,168 +1,222 @@
 import os
 import uuid
-import multiprocessing
 import shutil
-import queue
-
-from zipfile import ZipFile
-from pathlib import Path
+import asyncio
+import hashlib
 import tempfile
 
-from fastapi import APIRouter, Request, Form, UploadFile, File, Body, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from fastapi import APIRouter, Request, Body, HTTPException, BackgroundTasks
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
-from .workers import _offline_worker, _online_worker
+from .pool import get_pool
+from .scheduler import QueueFull, priority_for
+from .job_store import get_job_store, FAILED
+from .events import bridge
+from utils.upload import FormStream, ZipStreamExtractor, UploadRejected, UploadTooLarge
+from utils.results import COMPRESSIONS, stream_zip
+from utils.progress import ProgressEvent
+from inference.actions import ACTIONS
+from inference.glossing.registry import parse_ref
+from utils.model_store import ModelNotAvailableError
 
 templates = Jinja2Templates(directory="templates")
 router = APIRouter()
 
-jobs: dict[str, dict] = {}
-
 @router.get("/")
 async def index(request: Request):
     version = os.getenv("APP_VERSION", "dev")
     return templates.TemplateResponse("index.html", {"request": request, "app_version": version})
 
-@router.post("/process")
-async def process(
-    request: Request,
-    action: str = Form(...),
-    language: str = Form(...),
-    instruction: str | None = Form(None),
-    access_token: str | None = Form(None),
-    zipfile: UploadFile | None = File(None),
-    base_dir: str | None = Form(None),
-):
-    job_id = str(uuid.uuid4())
-    q = multiprocessing.Queue()
-    cancel = multiprocessing.Event()
-
-    token = access_token  # “token” now comes from form data
-    jobs[job_id] = {
-        "queue": q,
-        "cancel": cancel,
-        "zip_path": None,
-        "token": token,
+def _user_id(request: Request, token: str | None) -> str:
+    """Who a job belongs to for fair-share scheduling: the OneDrive token, else the client address."""
+    if token:
+        return hashlib.sha256(token.encode()).hexdigest()[:16]
+    return request.client.host if request.client else "anonymous"
+
+
+def _stages(fields: dict) -> list[str] | None:
+    """The ordered actions of a pipeline job, from its comma-separated `stages` field."""
+    if fields.get("action") != "pipeline":
+        return None
+    stages = [stage.strip() for stage in (fields.get("stages") or "").split(",") if stage.strip()]
+    allowed = [action for action in ACTIONS if action != "pipeline"]
+    unknown = [stage for stage in stages if stage not in allowed]
+    if not stages or unknown:
+        raise HTTPException(status_code=422, detail=f"stages must list actions out of {', '.join(allowed)}")
+    return stages
+
+
+def _custom_model(fields: dict) -> str | None:
+    """The custom glossing model reference ("name" or "name@version"), if any."""
+    model_ref = fields.get("custom_model") or None
+    if model_ref is not None:
+        try:
+            parse_ref(model_ref)
+        except ModelNotAvailableError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    return model_ref
+
+
+def _job_params(fields: dict) -> dict:
+    """Worker arguments from the submitted form fields."""
+    options = {
+        "profile": fields.get("profile") or "accurate",
+        "custom_model": _custom_model(fields),
+        "engine": fields.get("engine"),
+        "tone_style": fields.get("tone_style"),
+        "study": fields.get("study"),
+        "selection_engine": fields.get("selection_engine") or "generate",
+        "quantization": fields.get("quantization"),
+        "stages": _stages(fields),
+    }
+    return {
+        "action": fields.get("action"),
+        "language": fields.get("language"),
+        "instruction": fields.get("instruction"),
+        "options": options,
     }
 
-    if not language:
-        q.put("[ERROR] Missing language")
-        return {"job_id": job_id}
-
-    if zipfile is not None:
-        tmp_dir = tempfile.mkdtemp()
-        zip_path = Path(tmp_dir) / "upload.zip"
-        contents = await zipfile.read()
-        with open(zip_path, "wb") as f:
-            f.write(contents)
-        with ZipFile(zip_path, "r") as archive:
-            archive.extractall(tmp_dir)
-        os.remove(zip_path)
 
-        worker = _offline_worker
-        args = (job_id, tmp_dir, action, language, instruction, q, cancel)
-        jobs[job_id]["base_dir"] = tmp_dir
+@router.post("/process")
+async def process(request: Request):
+    """
+    Start a job. The multipart body is read as a stream: an uploaded `zipfile`
+    is extracted while it arrives and, since the form fields come first, the
+    job is queued before the upload finishes and starts on the first complete
+    Session_* folder.
+    """
+    job_id = str(uuid.uuid4())
+    store = get_job_store()
+    pool = get_pool()
+    upload = {}
+
+    def submit(fields, kind, **location):
+        if not fields.get("action"):
+            raise HTTPException(status_code=422, detail="Missing action")
+        token = fields.get("access_token")  # “token” now comes from form data
+        user = _user_id(request, token)
+        priority = priority_for(user)
+        params = {**_job_params(fields), **location}
+        store.create(job_id, kind, params["action"], user, params, priority)
+        if kind == "offline":
+            store.update(job_id, base_dir=location["base_dir"])
+        try:
+            pool.submit(job_id, kind, user=user, priority=priority, **params)
+        except QueueFull:
+            store.delete(job_id)
+            raise HTTPException(status_code=429, detail="Too many jobs waiting, try again later")
+        upload["submitted"] = True
+
+    def open_upload(fields, filename):
+        if pool.queue_full():
+            raise HTTPException(status_code=429, detail="Too many jobs waiting, try again later")
+        upload["dir"] = tempfile.mkdtemp()
+        extractor = ZipStreamExtractor(upload["dir"])
+        if fields.get("language"):
+            submit(fields, "offline", base_dir=upload["dir"])
+        return extractor
+
+    try:
+        fields = await FormStream(request, "zipfile", open_upload).parse()
+    except (UploadRejected, HTTPException) as e:
+        # a job that already started fails through the upload-failed marker
+        if upload.get("dir") and not upload.get("submitted"):
+            await asyncio.to_thread(shutil.rmtree, upload["dir"], ignore_errors=True)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=413 if isinstance(e, UploadTooLarge) else 400, detail=str(e))
+
+    def reject(reason):
+        # recorded as a failed job, so the client learns why from its stream
+        store.create(job_id, "offline", fields.get("action") or "", _user_id(request, None), {})
+        store.append_event(job_id, ProgressEvent("error", message=reason).to_json())
+        store.append_event(job_id, ProgressEvent("done").to_json())
+        store.update(job_id, status=FAILED)
+        if upload.get("dir"):
+            shutil.rmtree(upload["dir"], ignore_errors=True)
+
+    if not fields.get("language"):
+        await asyncio.to_thread(reject, "Missing language")
+        return {"job_id": job_id}
 
+    if upload.get("dir"):
+        if not upload.get("submitted"):
+            await asyncio.to_thread(submit, fields, "offline", base_dir=upload["dir"])
     else:
+        base_dir, token = fields.get("base_dir"), fields.get("access_token")
         if not (base_dir and token):
             raise HTTPException(status_code=400, detail="Missing base_dir or token")
-        worker = _online_worker
-        args = (job_id, base_dir, token, action, language, instruction, q, cancel)
-
-    p = multiprocessing.Process(target=worker, args=args, daemon=True)
-    p.start()
-    jobs[job_id]["process"] = p
+        if await asyncio.to_thread(pool.queue_full):
+            raise HTTPException(status_code=429, detail="Too many jobs waiting, try again later")
+        await asyncio.to_thread(submit, fields, "online", share_link=base_dir, token=token)
 
     return {"job_id": job_id}
 
 
 @router.get("/{job_id}/stream")
-async def stream(job_id: str):
-    job = jobs.get(job_id)
-    if not job:
+async def stream(job_id: str, request: Request, offset: int = -1):
+    """
+    Stream the job's events as SSE, replaying everything after `offset` (or
+    after the Last-Event-ID an EventSource sends when it reconnects) first.
+    """
+    if await asyncio.to_thread(get_job_store().get, job_id) is None:
         raise HTTPException(status_code=404, detail="Unknown job_id")
-
-    q: multiprocessing.Queue = job["queue"]
-
-    def event_generator():
-        # flush any backlog
-        while True:
-            try:
-                line = q.get_nowait()
-            except queue.Empty:
-                break
-
-            if line == "[DONE ALL]":
-                yield b"data: [DONE ALL]\n\n"
-                # job cleanup happens after streaming finishes
-                return
-            elif line.startswith("[ZIP PATH] "):
-                zip_path = line[len("[ZIP PATH] "):].strip()
-                job["zip_path"] = zip_path
-            else:
-                yield f"data: {line}\n\n".encode("utf-8")
-
-        # then block on new messages until "[DONE ALL]"
-        while True:
-            line = q.get()
-            if line == "[DONE ALL]":
-                yield b"data: [DONE ALL]\n\n"
-                break
-            elif line.startswith("[ZIP PATH] "):
-                zip_path = line[len("[ZIP PATH] "):].strip()
-                job["zip_path"] = zip_path
-            else:
-                yield f"data: {line}\n\n".encode("utf-8")
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        offset = max(offset, int(last_event_id))
+
+    return StreamingResponse(
+        bridge.subscribe(job_id, offset),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/cancel")
 async def cancel_job(payload: dict = Body(...)):
     jid = payload.get("job_id")
-    job = jobs.get(jid)
+    store = get_job_store()
+    job = await asyncio.to_thread(store.get, jid) if jid else None
     if not job:
         raise HTTPException(status_code=404, detail="Unknown job_id")
 
-    q: multiprocessing.Queue = job["queue"]
-    q.put("[CANCELLED]")
-    q.put("[DONE ALL]")
-
-    proc = job.get("process")
-    if proc and proc.is_alive():
-        proc.terminate()
-
-    jobs.pop(jid, None)
+    # the pool owning the job (here or in another API process) stops it after
+    # its current session; the worker stays up for the next job
+    await asyncio.to_thread(store.request_cancel, jid)
+    await asyncio.to_thread(get_pool().cancel, jid)
     return {"status": "cancelled"}
 
 
 @router.get("/{job_id}/download")
-async def download_zip(job_id: str, background_tasks: BackgroundTasks):
-    job = jobs.get(job_id)
+async def download_zip(job_id: str, background_tasks: BackgroundTasks, compression: str = "auto"):
+    """
+    Stream the job's result files as a ZIP built on the fly. `compression` is
+    "auto" (store already-compressed files such as .xlsx, deflate the rest),
+    "deflate" or "store".
+    """
+    store = get_job_store()
+    job = await asyncio.to_thread(store.get, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="No job")
-    zip_path = job.get("zip_path")
-    if not zip_path:
-        raise HTTPException(status_code=404, detail="No zip path")
-
+    files = job.get("results")
     base_dir = job.get("base_dir")
+    if files is None or not (base_dir and os.path.isdir(base_dir)):
+        raise HTTPException(status_code=404, detail="No results")
+    if compression not in COMPRESSIONS:
+        raise HTTPException(status_code=422, detail=f"compression must be one of {', '.join(COMPRESSIONS)}")
 
     def cleanup():
-        try:
-            os.remove(zip_path)
-        except OSError:
-            pass
-        if base_dir and os.path.isdir(base_dir):
-            shutil.rmtree(base_dir, ignore_errors=True)
-        jobs.pop(job_id, None)
+        shutil.rmtree(base_dir, ignore_errors=True)
+        store.delete(job_id)
 
     background_tasks.add_task(cleanup)
 
-    return FileResponse(
-        path=zip_path,
+    return StreamingResponse(
+        stream_zip(base_dir, files, compression),
         media_type="application/zip",
-        filename=f"{job_id}_results.zip"
+        headers={"Content-Disposition": f'attachment; filename="{job_id}_results.zip"'},
+        background=background_tasks,
     )
 
 
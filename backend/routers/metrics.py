@@ -0,0 +1,49 @@
+"""
+Prometheus metrics at /metrics.
+
+Stage latencies, item counts and throughput, OneDrive transfer bytes and model
+loads are recorded where the work happens (utils.metrics) and reach this
+process from the pool workers. Job counts, queue depth, worker memory and SSE
+streams are read when the endpoint is scraped.
+"""
+
+import os
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from .pool import get_pool
+from .job_store import get_job_store
+from .events import bridge
+from utils import metrics
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _scrape_gauges() -> list[tuple[str, str, list]]:
+    pool = get_pool().stats()
+    streams = bridge.stats()
+    rss = [({"process": "api"}, metrics.rss_bytes(os.getpid()))]
+    rss += [({"process": "worker", "slot": slot}, metrics.rss_bytes(pid)) for slot, pid in pool["pids"].items()]
+    return [
+        ("tgt_jobs", "Jobs in the job store by action and status",
+         [({"action": action, "status": status}, n) for action, status, n in get_job_store().counts()]),
+        ("tgt_queue_depth", "Jobs waiting for a worker", [({}, pool["pending"])]),
+        ("tgt_queue_depth_by_action", "Jobs waiting for a worker by action",
+         [({"action": action}, n) for action, n in sorted(pool["pending_by_action"].items())]),
+        ("tgt_workers", "Worker processes in the pool", [({}, pool["workers"])]),
+        ("tgt_workers_busy", "Workers running a job", [({}, pool["busy"])]),
+        ("tgt_process_rss_bytes", "Resident memory of the API process and each worker",
+         [(labels, value) for labels, value in rss if value is not None]),
+        ("tgt_stream_jobs", "Jobs with an open event stream", [({}, streams["jobs"])]),
+        ("tgt_stream_subscribers", "Connected event stream clients", [({}, streams["subscribers"])]),
+    ]
+
+
+@router.get("/metrics")
+def prometheus_metrics():
+    # samples recorded in this process (workers ship theirs through the pool)
+    metrics.REGISTRY.apply(metrics.drain())
+    return PlainTextResponse(metrics.REGISTRY.render(_scrape_gauges()), media_type=CONTENT_TYPE)
@@ -0,0 +1,383 @@
+"""
+Pool of long-lived worker processes.
+
+Workers are started once at app startup (TGT_WORKERS, default 2) and keep the
+models they loaded between jobs, so only the first job of a kind in a worker
+pays for imports and model loading. Jobs are handed to idle workers over a
+per-worker inbox in the order the scheduler picks (see scheduler.py), and
+waiting jobs are told their queue position. Every ProgressEvent a job
+produces comes back tagged with its job id on one shared result queue; a
+dispatcher thread appends it (as JSON) to the job's event log in the job
+store and keeps the job's status and result files up to date. Workers also
+send their buffered metric samples (utils.metrics) over that queue, with no
+job id, at most every METRICS_INTERVAL seconds and after every job.
+
+Admission is shared by every API process on the host: a job is picked and
+marked running inside one job store transaction (JobStore.admit) against the
+jobs running anywhere, and the queue limit counts every process's waiting
+jobs, so TGT_ACTION_LIMITS and TGT_MAX_QUEUE hold with several uvicorn workers.
+
+Cancelling a running job sets its worker's cancel event, which the job checks
+between sessions. Only a job that ignores it for TGT_CANCEL_GRACE seconds
+(default 30) gets its worker terminated and replaced. Cancellations requested
+through another API process are picked up from the job store, which is
+polled about once a second and whenever a job ends.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from dataclasses import replace
+
+from .scheduler import Scheduler, Task, QueueFull
+from .job_store import JobStore, get_job_store, DONE, FAILED, CANCELLED, INTERRUPTED
+from utils.progress import ProgressEvent
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv("TGT_WORKERS", "2"))
+CANCEL_GRACE = float(os.getenv("TGT_CANCEL_GRACE", "30"))
+# how often the job store is checked for cancels requested through another API process
+CANCEL_POLL_INTERVAL = 1.0
+# how often waiting jobs hear their position even if it did not change
+POSITION_INTERVAL = 5.0
+# how often a busy worker ships its metric samples
+METRICS_INTERVAL = 1.0
+
+# spawn: workers must not inherit the server's threads or event loop
+_ctx = multiprocessing.get_context("spawn")
+
+
+class _JobQueue:
+    """What a job sees as its queue: tags every event with the job id."""
+
+    def __init__(self, results, slot, job_id):
+        self.results = results
+        self.slot = slot
+        self.job_id = job_id
+        self._flushed = time.monotonic()
+
+    def put(self, msg):
+        self.results.put((self.slot, self.job_id, msg))
+        if time.monotonic() - self._flushed >= METRICS_INTERVAL:
+            self.flush_metrics()
+
+    def flush_metrics(self):
+        self._flushed = time.monotonic()
+        samples = metrics.drain()
+        if samples:
+            self.results.put((self.slot, None, samples))
+
+
+def _serve(slot, inbox, results, cancel):
+    """Worker process main loop: run jobs from the inbox until told to stop."""
+    from .workers import _offline_worker, _online_worker
+
+    targets = {"offline": _offline_worker, "online": _online_worker}
+    while True:
+        task = inbox.get()
+        if task is None:
+            break
+        job_id, kind, kwargs = task
+        q = _JobQueue(results, slot, job_id)
+        try:
+            targets[kind](job_id=job_id, q=q, cancel=cancel, **kwargs)
+        except BaseException as e:
+            # the worker functions report their own errors; this guards the loop
+            q.put(ProgressEvent("error", message=str(e)))
+            q.put(ProgressEvent("done"))
+        finally:
+            q.flush_metrics()
+
+
+class _Worker:
+    def __init__(self, slot, results):
+        self.slot = slot
+        self.inbox = _ctx.Queue()
+        self.cancel = _ctx.Event()
+        # not daemonic, so jobs may still start their own process pools
+        self.process = _ctx.Process(
+            target=_serve, args=(slot, self.inbox, results, self.cancel), name=f"tgt-worker-{slot}"
+        )
+        self.process.start()
+        self.task: Task | None = None
+        self.cancel_deadline = None
+
+    @property
+    def job_id(self):
+        return self.task.job_id if self.task else None
+
+
+class WorkerPool:
+    def __init__(self, size=POOL_SIZE, scheduler=None, store: JobStore | None = None):
+        self.size = max(1, size)
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.store = store if store is not None else get_job_store()
+        self._results = _ctx.Queue()
+        self._lock = threading.Lock()
+        self._workers: list[_Worker] = []
+        self._outcomes: dict[str, str] = {}
+        # called with the job id after every stored event (wakes SSE streams)
+        self.on_event = None
+        self._announced: dict[str, tuple[int, float]] = {}
+        self._serving = False
+        self._dispatcher = None
+        self._cancels_polled = 0.0
+
+    def start(self):
+        self._workers = [_Worker(slot, self._results) for slot in range(self.size)]
+        self._serving = True
+        self._dispatcher = threading.Thread(target=self._route, name="tgt-pool-dispatcher", daemon=True)
+        self._dispatcher.start()
+        logger.info(f"Started {self.size} worker(s)")
+
+    def stop(self, timeout=10):
+        self._serving = False
+        for worker in self._workers:
+            worker.inbox.put(None)
+        for worker in self._workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        if self._dispatcher:
+            self._dispatcher.join(timeout)
+
+    def submit(self, job_id, kind, user="anonymous", priority=0, **kwargs):
+        """
+        Queue a job already recorded in the job store ("offline" or "online"
+        worker kwargs). Raises scheduler.QueueFull when too many jobs are waiting.
+        """
+        task = Task(job_id, kind, kwargs, kwargs["action"], user, priority)
+        waiting = self.store.waiting(exclude=job_id)
+        with self._lock:
+            self.scheduler.add(task, waiting)
+            self._dispatch()
+
+    def queue_full(self) -> bool:
+        """Whether a new job would be refused, counting the jobs waiting in every API process."""
+        return self.scheduler.full(self.store.waiting())
+
+    def cancel(self, job_id) -> bool:
+        with self._lock:
+            if self.scheduler.remove(job_id):
+                self._finish(job_id, ProgressEvent("cancelled"))
+                self._announce(force=True)
+                return True
+            for worker in self._workers:
+                if worker.job_id == job_id:
+                    worker.cancel.set()
+                    if worker.cancel_deadline is None:
+                        worker.cancel_deadline = time.monotonic() + CANCEL_GRACE
+                    return True
+        return False
+
+    @staticmethod
+    def _tasks(jobs: list[dict]) -> list[Task]:
+        """Tasks for running jobs as recorded in the job store (by any API process)."""
+        return [
+            Task(job["job_id"], job["kind"], job["params"] or {}, job["action"], job["user"], job["priority"],
+                 started_at=job.get("started_at"))
+            for job in jobs
+        ]
+
+    def _running(self) -> list[Task]:
+        return self._tasks(self.store.running())
+
+    def _admit(self) -> Task | None:
+        """Take the next task and mark it running, unless a cap or memory holds it back."""
+        # caller holds self._lock
+        picked = []
+
+        def choose(running):
+            task = self.scheduler.next(self._tasks(running))
+            if task is not None:
+                picked.append(task)
+            return task and task.job_id
+
+        try:
+            self.store.admit(choose)
+        except Exception:
+            # not started: keep it queued
+            self.scheduler.pending.extend(picked)
+            raise
+        return picked[0] if picked else None
+
+    def _dispatch(self):
+        # caller holds self._lock
+        for worker in self._workers:
+            if not len(self.scheduler):
+                break
+            if worker.task is not None or not worker.process.is_alive():
+                continue
+            task = self._admit()
+            if task is None:
+                break
+            worker.cancel.clear()
+            worker.cancel_deadline = None
+            worker.task = task
+            self._announced.pop(task.job_id, None)
+            self._emit(task.job_id, ProgressEvent(
+                "started", message=f"Started after waiting {task.waited:.0f}s", data={"waited": round(task.waited, 1)}
+            ))
+            worker.inbox.put((task.job_id, task.kind, task.kwargs))
+        self._announce()
+
+    def _announce(self, force=False):
+        """Tell waiting jobs their queue position when it changes (or every few seconds)."""
+        # caller holds self._lock
+        now = time.monotonic()
+        total = len(self.scheduler)
+        if not total:
+            return
+        for task, position in self.scheduler.positions(self._running()):
+            last = self._announced.get(task.job_id)
+            if not force and last and last[0] == position and now - last[1] < POSITION_INTERVAL:
+                continue
+            self._announced[task.job_id] = (position, now)
+            self._emit(task.job_id, ProgressEvent(
+                "queued",
+                message=f"Position {position} of {total}, waiting {task.waited:.0f}s",
+                index=position,
+                total=total,
+                data={"waited": round(task.waited, 1)},
+            ))
+
+    def _emit(self, job_id, event: ProgressEvent):
+        self.store.append_event(job_id, event.to_json())
+        if self.on_event is not None:
+            self.on_event(job_id)
+
+    def _record(self, job_id, msg):
+        """Store one event from a job; returns True once the job is over."""
+        # caller holds self._lock
+        event = ProgressEvent.coerce(msg)
+        if event.type == "results":
+            self.store.update(job_id, results=event.data)
+            return False
+        if event.type == "error" and event.session is None:
+            # a failed session alone does not fail the job (see workers._SessionRunner)
+            self._outcomes[job_id] = FAILED
+        elif event.type == "cancelled":
+            self._outcomes.setdefault(job_id, CANCELLED)
+        if event.type != "done":
+            self._emit(job_id, event)
+            return False
+        # the closing event tells clients how the job ended (failed sessions alone leave it done);
+        # it is stored before the status, so a reader that sees the job finished has it too
+        status = self._outcomes.pop(job_id, DONE)
+        self._emit(job_id, replace(event, data={"status": status}))
+        self.store.update(job_id, status=status)
+        return True
+
+    def _finish(self, job_id, *events):
+        # caller holds self._lock
+        self._announced.pop(job_id, None)
+        for event in (*events, ProgressEvent("done")):
+            self._record(job_id, event)
+
+    def _route(self):
+        while self._serving:
+            try:
+                slot, job_id, msg = self._results.get(timeout=1)
+            except queue.Empty:
+                self._supervise()
+                continue
+
+            if job_id is None:
+                metrics.REGISTRY.apply(msg)
+                continue
+            if ProgressEvent.coerce(msg).type == "done":
+                # a worker frees up: drop cancelled jobs before picking the next one
+                self._apply_cancels(force=True)
+            with self._lock:
+                worker = self._workers[slot]
+                if worker.job_id != job_id:
+                    # late output of a job whose worker was already replaced
+                    continue
+                if self._record(job_id, msg):
+                    worker.task = None
+                    worker.cancel_deadline = None
+                    self._dispatch()
+            self._supervise()
+
+    def _apply_cancels(self, force=False):
+        """Cancel this pool's jobs that were cancelled through the job store (at most every CANCEL_POLL_INTERVAL)."""
+        now = time.monotonic()
+        if not force and now - self._cancels_polled < CANCEL_POLL_INTERVAL:
+            return
+        self._cancels_polled = now
+        with self._lock:
+            mine = [w.job_id for w in self._workers if w.task] + [t.job_id for t in self.scheduler.pending]
+        for job_id in self.store.cancel_requested(mine):
+            self.cancel(job_id)
+
+    def _supervise(self):
+        """Apply stored cancel requests; replace workers that died or ignored a cancel."""
+        self._apply_cancels()
+        with self._lock:
+            if not self._serving:
+                return
+            now = time.monotonic()
+            for slot, worker in enumerate(self._workers):
+                overdue = worker.task is not None and worker.cancel_deadline is not None and now > worker.cancel_deadline
+                if worker.process.is_alive() and not overdue:
+                    continue
+                if overdue:
+                    worker.process.terminate()
+                    worker.process.join(5)
+                    self._outcomes.pop(worker.job_id, None)
+                    self._finish(worker.job_id, ProgressEvent("cancelled"))
+                elif worker.job_id is not None:
+                    self._finish(worker.job_id, ProgressEvent("error", message=f"Worker exited with code {worker.process.exitcode}"))
+                logger.warning(f"Replacing worker {slot}")
+                self._workers[slot] = _Worker(slot, self._results)
+            self._dispatch()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending_by_action = {}
+            for task in self.scheduler.pending:
+                pending_by_action[task.action] = pending_by_action.get(task.action, 0) + 1
+            return {
+                "workers": self.size,
+                "busy": sum(w.task is not None for w in self._workers),
+                "pending": len(self.scheduler),
+                "pending_by_action": pending_by_action,
+                "pids": {w.slot: w.process.pid for w in self._workers if w.process.is_alive()},
+            }
+
+
+pool: WorkerPool | None = None
+
+
+def start_pool(size=POOL_SIZE) -> WorkerPool:
+    global pool
+    if pool is None:
+        pool = WorkerPool(size)
+        pool.start()
+        # jobs left queued by an API process that is gone run here instead
+        for job in pool.store.recover():
+            logger.info(f"Requeueing job {job['job_id']}")
+            try:
+                pool.submit(job["job_id"], job["kind"], user=job["user"], priority=job["priority"], **job["params"])
+            except QueueFull:
+                pool.store.update(job["job_id"], status=INTERRUPTED)
+                pool.store.append_event(job["job_id"], ProgressEvent("error", message="Job queue full after a server restart").to_json())
+                pool.store.append_event(job["job_id"], ProgressEvent("done").to_json())
+    return pool
+
+
+def stop_pool():
+    global pool
+    if pool is not None:
+        pool.stop()
+        pool = None
+
+
+def get_pool() -> WorkerPool:
+    # started lazily when the app runs without its lifespan (e.g. in a script)
+    return pool or start_pool()
@@ -0,0 +1,180 @@
+"""
+Admission control and ordering for jobs waiting on the worker pool.
+
+Configured from the environment:
+
+    TGT_MAX_QUEUE=20                          jobs that may wait; more get HTTP 429
+    TGT_ACTION_LIMITS=transcribe=1,gloss=4    concurrent jobs per action
+    TGT_ACTION_MEMORY_MB=transcribe=8000,...  memory a job of that action needs
+                                              before it is started
+    TGT_MEMORY_WARMUP_S=300                   how long a started job's memory is
+                                              reserved while its models load
+    TGT_PRIORITY_USERS=10.0.0.5,3f2a...       users (client address or hashed
+                                              OneDrive token) whose jobs go first
+
+A job is started only when its action is under its cap and the machine has
+the estimated memory available (unless nothing is running at all, so a large
+job can never wait forever). Jobs started within TGT_MEMORY_WARMUP_S may not
+have loaded their models yet, so their memory is subtracted from what the
+machine reports as free. A pipeline job counts against the cap of each of
+its stages and needs the memory of all of them. Among eligible jobs the highest priority wins,
+then the user with the fewest running jobs, then the oldest. Priority is set
+by the server (TGT_PRIORITY_USERS), never by the client.
+
+Caps and the queue limit count the jobs of every API process on the host:
+the pool passes in the running jobs and the number waiting as recorded in
+the job store (see JobStore.admit).
+"""
+
+import os
+import time
+import logging
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_limits(value: str, cast=int) -> dict:
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        action, _, limit = item.partition("=")
+        limits[action.strip()] = cast(limit)
+    return limits
+
+
+MAX_QUEUE = int(os.getenv("TGT_MAX_QUEUE", "20"))
+ACTION_LIMITS = {"transcribe": 1, **_parse_limits(os.getenv("TGT_ACTION_LIMITS", ""))}
+ACTION_MEMORY_MB = {
+    "transcribe": 8000,
+    "select": 4000,
+    "translate": 1500,
+    "gloss": 2000,
+    **_parse_limits(os.getenv("TGT_ACTION_MEMORY_MB", "")),
+}
+MEMORY_WARMUP_S = float(os.getenv("TGT_MEMORY_WARMUP_S", "300"))
+PRIORITY_USERS = {user.strip() for user in os.getenv("TGT_PRIORITY_USERS", "").split(",") if user.strip()}
+
+
+def priority_for(user: str) -> int:
+    """1 for the users listed in TGT_PRIORITY_USERS, 0 for everyone else."""
+    return 1 if user in PRIORITY_USERS else 0
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while TGT_MAX_QUEUE jobs are already waiting."""
+
+
+def available_memory_mb() -> float | None:
+    """MemAvailable from /proc/meminfo, or psutil elsewhere; None if unknown."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().available / 2**20
+    except ImportError:
+        return None
+
+
+@dataclass
+class Task:
+    job_id: str
+    kind: str
+    kwargs: dict
+    action: str
+    user: str = "anonymous"
+    priority: int = 0
+    submitted_at: float = field(default_factory=time.monotonic)
+    # wall-clock start of a running job, as recorded in the job store
+    started_at: float | None = None
+
+    @property
+    def waited(self) -> float:
+        return time.monotonic() - self.submitted_at
+
+    @property
+    def actions(self) -> tuple[str, ...]:
+        """The actions the job runs: a pipeline's stages, otherwise its action."""
+        if self.action == "pipeline":
+            return tuple((self.kwargs.get("options") or {}).get("stages") or ())
+        return (self.action,)
+
+
+class Scheduler:
+    def __init__(self, max_queue=MAX_QUEUE, limits=None, memory_mb=None, memory_probe=available_memory_mb,
+                 warmup=MEMORY_WARMUP_S):
+        self.max_queue = max_queue
+        self.limits = ACTION_LIMITS if limits is None else limits
+        self.memory_mb = ACTION_MEMORY_MB if memory_mb is None else memory_mb
+        self.memory_probe = memory_probe
+        self.warmup = warmup
+        self.pending: list[Task] = []
+
+    def __len__(self):
+        return len(self.pending)
+
+    def full(self, waiting: int | None = None) -> bool:
+        """Whether `waiting` jobs (default: this scheduler's own) fill the queue."""
+        return (len(self.pending) if waiting is None else waiting) >= self.max_queue
+
+    def add(self, task: Task, waiting: int | None = None):
+        if self.full(waiting):
+            raise QueueFull(f"{len(self.pending) if waiting is None else waiting} jobs are already waiting")
+        self.pending.append(task)
+
+    def remove(self, job_id) -> Task | None:
+        for task in self.pending:
+            if task.job_id == job_id:
+                self.pending.remove(task)
+                return task
+        return None
+
+    def order(self, running: list[Task]) -> list[Task]:
+        """Pending tasks in the order they would be started."""
+        by_user = {}
+        for task in running:
+            by_user[task.user] = by_user.get(task.user, 0) + 1
+        return sorted(self.pending, key=lambda t: (-t.priority, by_user.get(t.user, 0), t.submitted_at))
+
+    def needed_mb(self, task: Task) -> float:
+        # models stay loaded between a pipeline's stages
+        return sum(self.memory_mb.get(action, 0) for action in set(task.actions))
+
+    def reserved_mb(self, running: list[Task]) -> float:
+        """Memory of running jobs that may still be loading their models, so is not yet in use."""
+        now = time.time()
+        return sum(
+            self.needed_mb(task) for task in running
+            if task.started_at is None or now - task.started_at < self.warmup
+        )
+
+    def next(self, running: list[Task]) -> Task | None:
+        """Take the next task that may start next to `running`, if any."""
+        by_action = {}
+        for task in running:
+            for action in set(task.actions):
+                by_action[action] = by_action.get(action, 0) + 1
+
+        free_mb = self.memory_probe() if running else None
+        if free_mb is not None:
+            free_mb -= self.reserved_mb(running)
+        for task in self.order(running):
+            if any(by_action.get(action, 0) >= self.limits.get(action, float("inf")) for action in task.actions):
+                continue
+            needed = self.needed_mb(task)
+            if free_mb is not None and needed > free_mb:
+                logger.info(
+                    f"Holding {task.action} job {task.job_id}: needs {needed} MB, "
+                    f"{free_mb:.0f} MB free after what starting jobs reserve"
+                )
+                continue
+            self.pending.remove(task)
+            return task
+        return None
+
+    def positions(self, running: list[Task]) -> list[tuple[Task, int]]:
+        return [(task, i) for i, task in enumerate(self.order(running), start=1)]
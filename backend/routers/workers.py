@@ -1,81 +1,219 @@
 import os
+import time
 import tempfile
+import threading
 import traceback
 import shutil
 import queue
 import requests
 import base64
 
-from zipfile import ZipFile
 from pathlib import Path
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait
 
-from inference.api_interface.transcribe import Transcriber
-from inference.api_interface.translate import Translator
-from inference.api_interface.gloss import Glosser
-from inference.api_interface.transliterate import Transliterator
-
+from inference.actions import load_action
 from utils.onedrive import download_sharepoint_folder, upload_file_replace_in_onedrive
-from utils.reorder_columns import create_columns
+from utils.upload import READY_MARKER, UPLOAD_COMPLETE, UPLOAD_FAILED
+from utils.results import collect_results
+from utils.progress import ProgressEvent
+from utils import metrics
+
+# give up on an upload that has not made progress for this long
+UPLOAD_TIMEOUT = float(os.getenv("TGT_UPLOAD_TIMEOUT", "900"))
+# sessions of one job processed at the same time
+SESSION_WORKERS = max(1, int(os.getenv("TGT_SESSION_WORKERS", "4")))
+# actions whose processing step may run for several sessions at once; they
+# share one loaded model per worker, which holds a lock around its model calls
+# (spreadsheet I/O and the rest of the work overlap). Transcription loads
+# whisper per session and selection already keeps every core busy, so their
+# sessions take turns (downloads and uploads of online jobs still overlap).
+PARALLEL_ACTIONS = {"translate", "gloss", "transliterate", "create columns"}
 
 
-def _offline_worker(job_id, base_dir, action, language, instruction, q, cancel):
+def _sender(q):
     """
-    Process an uploaded ZIP (offline mode).  Walk through all Session_* folders,
-    run Transcriber/Translator/Glosser/create_columns, then zip up the results.
+    put(message) logs a line; put(message, type, **fields) sends any other
+    ProgressEvent and put(event) an event as it is.
     """
-    def put(msg): 
-        q.put(msg)
+    def put(message=None, type="log", **fields):
+        if isinstance(message, ProgressEvent):
+            q.put(message)
+        else:
+            q.put(ProgressEvent(type, message=message, **fields))
+    return put
 
-    try:
-        put("Processing uploaded files…")
 
-        # find all Session_* directories
-        sessions = [
-            os.path.join(root, subdir)
-            for root, dirs, _ in os.walk(base_dir)
-            for subdir in dirs if subdir.startswith("Session_")
-        ]
+def _select(session, language, options, progress):
+    """Run the sentence selector on one session, reporting progress per row."""
+    # the selector model is shared, so later sessions reuse the loaded one
+    with load_action("select")(
+        session,
+        language,
+        options.get("study") or "",
+        "cpu",
+        quantization=options.get("quantization"),
+        engine=options.get("selection_engine") or "generate",
+    ) as selector:
+        selector.process_data(progress=progress)
+
+
+def _ready_sessions(base_dir, cancel):
+    """
+    Yield Session_* folders as the upload marks them complete (see utils.upload)
+    until the whole archive is extracted, so work starts before the upload ends.
+    A session the archive returned to is yielded again.
+    """
+    base = Path(base_dir)
+    seen = {}
+    last_progress = time.monotonic()
+    while not cancel.is_set():
+        if (base / UPLOAD_FAILED).exists():
+            raise RuntimeError(f"Upload failed: {(base / UPLOAD_FAILED).read_text()}")
+        # checked before scanning, so no session marked in between is missed
+        complete = (base / UPLOAD_COMPLETE).exists()
+        fresh = []
+        for marker in sorted(base.rglob(READY_MARKER)):
+            generation = marker.read_text()
+            if seen.get(marker.parent) != generation:
+                seen[marker.parent] = generation
+                fresh.append(marker.parent)
+        for session in fresh:
+            yield str(session)
+        if fresh:
+            last_progress = time.monotonic()
+        elif complete:
+            return
+        elif time.monotonic() - last_progress > UPLOAD_TIMEOUT:
+            raise TimeoutError(f"Upload made no progress for {UPLOAD_TIMEOUT:.0f}s")
+        else:
+            time.sleep(0.5)
 
-        for session in sessions:
-            if cancel.is_set():
-                put("[CANCELLED]")
-                break
 
-            name = os.path.basename(session)
-            put(f"Processing session: {name}")
+def _process(action, session, language, instruction, options, report, guard, verbose=False):
+    """
+    Run `action` on one session folder, holding `guard(action)` (per stage for
+    pipelines). The action's implementation is imported on first use.
+    """
+    with metrics.timed("tgt_session_seconds", action=action):
+        implementation = load_action(action)
+        if action == "pipeline":
+            with implementation(session, language, instruction, options.get("stages") or [], options, guard=guard) as pipeline:
+                pipeline.process_data(progress=report)
+            return
 
+        with guard(action):
             if action == "transcribe":
-                Transcriber(session, language, "cpu").process_data(verbose=True)
+                implementation(session, language, "cpu").process_data(verbose=verbose, progress=report)
             elif action == "translate":
-                Translator(session, language, instruction, "cpu").process_data(verbose=True)
+                with implementation(session, language, instruction, "cpu") as translator:
+                    translator.process_data(verbose=verbose, progress=report)
             elif action == "gloss":
-                Glosser(session, language, instruction).process_data()
+                with implementation(session, language, instruction, options.get("profile"), options.get("custom_model")) as glosser:
+                    glosser.process_data(progress=report)
             elif action == "transliterate":
-                Transliterator(session, language, instruction).process_data(verbose=True)
+                with implementation(session, language, instruction, engine=options.get("engine"), style=options.get("tone_style")) as transliterator:
+                    transliterator.process_data(progress=report)
+            elif action == "select":
+                _select(session, language, options, report)
             elif action == "create columns":
-                create_columns(session, language)
-
-        # create ZIP of entire folder
-        zip_path = Path(tempfile.gettempdir()) / f"{job_id}_output.zip"
-        with ZipFile(zip_path, "w") as z:
-            for root, _, files in os.walk(base_dir):
-                for file in files:
-                    if file in (
-                        "trials_and_sessions_annotated.xlsx",
-                        "transcription.log",
-                        "translation.log",
-                    ):
-                        full = os.path.join(root, file)
-                        rel = os.path.relpath(full, base_dir)
-                        z.write(full, arcname=rel)
-
-        put(f"[ZIP PATH] {zip_path}")
-        # The caller (jobs.py) will write into jobs[job_id]["zip_path"] and ["base_dir"]
+                implementation(session, language)
+
+
+class _SessionRunner:
+    """
+    Runs the sessions of one job on up to SESSION_WORKERS threads.
+
+    A session that fails is reported as an error event tagged with its name
+    while the other sessions carry on; only a job whose sessions all failed
+    fails as a whole. Each session writes its results into its own folder, so
+    the result layout does not depend on the order sessions finish in.
+    """
+
+    def __init__(self, put, cancel, action, workers=SESSION_WORKERS):
+        self.put = put
+        self.cancel = cancel
+        self.action = action
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="tgt-session")
+        self._serial = threading.Lock()
+        self.futures = []
+        self.failed: dict[str, str] = {}
+        self.done: set[str] = set()
+        self._session_locks: dict[str, threading.Lock] = {}
+
+    def submit(self, name, fn, *args):
+        # a session the upload returned to waits for its earlier run
+        lock = self._session_locks.setdefault(name, threading.Lock())
+
+        def run():
+            with lock:
+                if self.cancel.is_set():
+                    return
+                try:
+                    fn(*args)
+                except Exception as e:
+                    self.failed[name] = str(e)
+                    self.put(str(e), "error", session=name, data=traceback.format_exc())
+                    metrics.inc("tgt_sessions_total", action=self.action, result="failed")
+                else:
+                    self.failed.pop(name, None)
+                    self.done.add(name)
+                    metrics.inc("tgt_sessions_total", action=self.action, result="ok")
+
+        self.futures.append(self.executor.submit(run))
+
+    def guard(self, action):
+        """Held around the processing step of `action`: a shared lock unless it may overlap."""
+        return nullcontext() if action in PARALLEL_ACTIONS else self._serial
+
+    def finish(self):
+        """Wait for every session; report failures and raise if no session succeeded."""
+        wait(self.futures)
+        self.executor.shutdown()
+        if self.failed:
+            names = ", ".join(sorted(self.failed))
+            if not self.done - set(self.failed):
+                raise RuntimeError(f"All {len(self.failed)} session(s) failed: {names}")
+            self.put(f"{len(self.failed)} of {len(self.done | set(self.failed))} sessions failed: {names}")
+
+
+def _offline_worker(job_id, base_dir, action, language, instruction, q, cancel, options=None):
+    """
+    Process an uploaded ZIP (offline mode).  Hand the Session_* folders to a
+    _SessionRunner as they finish extracting, run Transcriber/Translator/Glosser/SentenceSelector/create_columns, then report
+    the result files for download.
+    `options` carries optional per-job settings such as the glossing profile.
+    """
+    options = options or {}
+    put = _sender(q)
+
+    try:
+        put("Processing uploaded files…")
+        runner = _SessionRunner(put, cancel, action)
+
+        def process(session, name):
+            put(f"Processing session: {name}", session=name)
+            report = lambda event: put(event.with_session(name))
+            _process(action, session, language, instruction, options, report, runner.guard, verbose=True)
+
+        try:
+            for session in _ready_sessions(base_dir, cancel):
+                if cancel.is_set():
+                    break
+                name = os.path.basename(session)
+                runner.submit(name, process, session, name)
+        finally:
+            runner.finish()
+
+        if cancel.is_set():
+            put(type="cancelled")
+
+        # the download endpoint zips these on the fly; the pool stores the list
+        put(type="results", data=collect_results(base_dir))
     except Exception as e:
-        put(f"[ERROR] {e}")
-        put(traceback.format_exc())
+        put(str(e), "error", data=traceback.format_exc())
     finally:
-        put("[DONE ALL]")
+        put(type="done")
 
 
 def _list_session_children(share_link: str, token: str):
@@ -94,88 +232,82 @@ def _list_session_children(share_link: str, token: str):
     ]
 
 
-def _online_worker(job_id, share_link, token, action, language, instruction, q, cancel):
+def _online_worker(job_id, share_link, token, action, language, instruction, q, cancel, options=None):
     """
     Download each Session_* folder from OneDrive (online mode), run Transcriber/Translator/Glosser/create_columns,
-    upload results back into OneDrive, and report progress to the queue.
+    upload results back into OneDrive, and report progress to the queue. Sessions
+    run side by side on a _SessionRunner.
     """
-    def put(msg):
-        q.put(msg)
+    options = options or {}
+    put = _sender(q)
 
-    try:
-        put("Checking for multiple sessions in OneDrive…")
-        sessions_meta = _list_session_children(share_link, token)
+    def process(session_link, name):
+        put(f"Downloading from OneDrive", session=name)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            inp, drive_id, _, sess_map = download_sharepoint_folder(
+                share_link=session_link,
+                temp_dir=tmp_dir,
+                access_token=token,
+                progress=lambda event: put(event.with_session(name)),
+            )
 
-        if not sessions_meta:
-            # if there are no nested Session_ folders, assume share_link points directly to a single Session
-            sessions_meta = [{"webUrl": share_link}]
-
-        put(f"Found {len(sessions_meta)} sessions")
-        for entry in sessions_meta:
-            if cancel.is_set():
-                put("[CANCELLED]")
-                break
-
-            session_link = entry.get("webUrl")
-            put(f"Downloading from OneDrive")
-            tmp_dir = tempfile.mkdtemp()
-            try:
-                inp, drive_id, _, sess_map = download_sharepoint_folder(
-                    share_link=session_link,
-                    temp_dir=tmp_dir,
-                    access_token=token,
-                )
-            except Exception as e:
-                put(f"Failed to download session: {e}. Will skip.")
-                shutil.rmtree(tmp_dir, ignore_errors=True)
-                continue
-
-            session_name = entry.get("name") or next(iter(sess_map.keys()), Path(inp).name)
-            put(f"Processing session: {session_name}")
+            session_name = name or next(iter(sess_map.keys()), Path(inp).name)
+            put(f"Processing session: {session_name}", session=session_name)
+            report = lambda event: put(event.with_session(session_name))
 
             session_path = os.path.join(inp, session_name)
             if not os.path.isdir(session_path):
                 session_path = inp
 
-            uploads = []
-            if action == "transcribe":
-                Transcriber(session_path, language, "cpu").process_data()
-                uploads = ["transcription.log"]
-            elif action == "translate":
-                Translator(session_path, language, instruction, "cpu").process_data()
-                uploads = ["translation.log"]
-            elif action == "gloss":
-                Glosser(session_path, language, instruction).process_data()
-            elif action == "transliterate":
-                Transliterator(session_path, language, instruction).process_data()
-            elif action == "create columns":
-                create_columns(session_path, language)
-
+            _process(action, session_path, language, instruction, options, report, runner.guard)
+            stages = (options.get("stages") or []) if action == "pipeline" else [action]
+            logs = {"transcribe": "transcription.log", "translate": "translation.log"}
+            uploads = [logs[stage] for stage in stages if stage in logs]
             uploads.append("trials_and_sessions_annotated.xlsx")
 
             for fname in uploads:
                 if cancel.is_set():
-                    put("[CANCELLED]")
-                    break
+                    return
                 local_fp = os.path.join(session_path, fname)
                 if not os.path.exists(local_fp):
-                    put(f"Skipping missing: {fname}")
+                    put(f"Skipping missing: {fname}", session=session_name)
                     continue
 
-                put(f"Uploading {fname} for {session_name}")
+                put(f"Uploading {fname} for {session_name}", session=session_name)
                 upload_file_replace_in_onedrive(
                     local_file_path=local_fp,
                     target_drive_id=drive_id,
                     parent_folder_id=sess_map.get(session_name, ""),
                     file_name_in_folder=fname,
                     access_token=token,
+                    progress=report,
                 )
 
+            put(type="uploaded", session=session_name)
+        finally:
             shutil.rmtree(tmp_dir, ignore_errors=True)
-            put(f"[DONE UPLOADED] {session_name}")
+
+    try:
+        put("Checking for multiple sessions in OneDrive…")
+        sessions_meta = sorted(_list_session_children(share_link, token), key=lambda entry: entry["name"])
+
+        if not sessions_meta:
+            # if there are no nested Session_ folders, assume share_link points directly to a single Session
+            sessions_meta = [{"webUrl": share_link}]
+
+        put(f"Found {len(sessions_meta)} sessions")
+        runner = _SessionRunner(put, cancel, action)
+        try:
+            for entry in sessions_meta:
+                runner.submit(entry.get("name") or "session", process, entry.get("webUrl"), entry.get("name"))
+        finally:
+            runner.finish()
+
+        if cancel.is_set():
+            put(type="cancelled")
 
     except Exception as e:
-        put(f"[ERROR] {e}")
-        put(traceback.format_exc())
+        put(str(e), "error", data=traceback.format_exc())
     finally:
-        put("[DONE ALL]")
+        put(type="done")
@@ -5,12 +5,15 @@ import string
 import os
 import shutil
 import logging
+import threading
 import subprocess
 import urllib.request
 import zipfile
 import openpyxl
 
+from contextlib import contextmanager
 from openpyxl.styles import Font
+from utils.metrics import timed
 
 def load_json_file(file_path):
     """Utility function to load JSON files with error handling."""
@@ -160,28 +163,64 @@ def format_excel_output(excel_output_file, columns_to_highlight: list):
     wb.save(excel_output_file)
 
 
-def setup_logging(logger, log_path):
-    logger.setLevel(logging.DEBUG)
+def write_excel_output(df, excel_output_file, columns_to_highlight: list):
+    """Write `df` and colour the highlighted columns red in a single save."""
+    import pandas as pd
+
+    red = Font(color="FF0000")
+    with timed(stage="excel_write"), pd.ExcelWriter(excel_output_file, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False)
+        ws = next(iter(writer.sheets.values()))
+        for col_i, header in enumerate(df.columns, start=1):
+            if header not in columns_to_highlight:
+                continue
+            for (cell,) in ws.iter_rows(min_row=2, min_col=col_i, max_col=col_i):
+                if cell.value:
+                    cell.font = red
 
-    # Clear existing handlers (avoid duplicates if run multiple times)
-    if logger.hasHandlers():
-        logger.handlers.clear()
 
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.DEBUG)
-    console_formatter = logging.Formatter("%(message)s")
-    console_handler.setFormatter(console_formatter)
+def setup_logging(logger, log_path):
+    """
+    Log to stdout and to `log_path`. The file only receives records of the
+    calling thread, so sessions processed side by side keep separate logs.
+    """
+    logger.setLevel(logging.DEBUG)
+    thread = threading.get_ident()
+
+    # Drop this thread's earlier handlers (avoid duplicates if run multiple times)
+    for handler in list(logger.handlers):
+        if getattr(handler, "thread", thread) == thread:
+            logger.removeHandler(handler)
+            handler.close()
+
+    # Console handler, shared by all threads
+    if not any(getattr(handler, "thread", None) is None for handler in logger.handlers):
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(logging.DEBUG)
+        console_formatter = logging.Formatter("%(message)s")
+        console_handler.setFormatter(console_formatter)
+        console_handler.thread = None
+        logger.addHandler(console_handler)
 
     # File handler
     file_handler = logging.FileHandler(log_path, mode='w', encoding='utf-8')
     file_handler.setLevel(logging.DEBUG)
     file_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
     file_handler.setFormatter(file_formatter)
-
-    # Add both handlers
-    logger.addHandler(console_handler)
+    file_handler.thread = thread
+    file_handler.addFilter(lambda record: record.thread == thread)
     logger.addHandler(file_handler)
 
     return file_handler
 
+
+@contextmanager
+def logging_to(logger, log_path):
+    """setup_logging for the duration of a block."""
+    handler = setup_logging(logger, log_path)
+    try:
+        yield handler
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
@@ -0,0 +1,156 @@
+"""
+Process metrics in the Prometheus text format, without a client library.
+
+Code anywhere records samples with inc(), set_gauge(), observe() or timed().
+They are buffered per process: a pool worker ships its buffer to the API
+process over the pool's result queue (see routers/pool.py), where they are
+merged into REGISTRY and rendered by /metrics together with values read at
+scrape time (job counts, queue depth, worker RSS).
+
+    with timed(stage="asr"):
+        result = model.transcribe(audio)
+    inc("tgt_items_total", 512, stage="gloss", unit="lines")
+"""
+
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+# seconds; covers a translated row up to a long diarization
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# name -> (type, help) of every metric workers record
+METRICS = {
+    "tgt_stage_seconds": ("histogram", "Latency of one unit of work in a processing stage"),
+    "tgt_session_seconds": ("histogram", "Time to process one session, by action"),
+    "tgt_sessions_total": ("counter", "Sessions processed by action and result (ok or failed)"),
+    "tgt_items_total": ("counter", "Items processed per stage"),
+    "tgt_items_per_second": ("gauge", "Most recent throughput of a stage"),
+    "tgt_transfer_bytes_total": ("counter", "Bytes transferred per stage (OneDrive download and upload)"),
+    "tgt_model_load_seconds": ("histogram", "Time to load a model"),
+    "tgt_model_cache_requests_total": ("counter", "Shared model instance requests by result (hit or build)"),
+}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+        self._histograms: dict[tuple, list] = {}
+
+    def apply(self, samples):
+        """Merge samples recorded with inc/set_gauge/observe (possibly in another process)."""
+        with self._lock:
+            for kind, name, labels, value in samples:
+                key = (name, tuple(sorted(labels.items())))
+                if kind == "inc":
+                    self._values[key] = self._values.get(key, 0) + value
+                elif kind == "set":
+                    self._values[key] = value
+                else:
+                    histogram = self._histograms.setdefault(key, [[0] * len(BUCKETS), 0.0, 0])
+                    for i, bound in enumerate(BUCKETS):
+                        if value <= bound:
+                            histogram[0][i] += 1
+                    histogram[1] += value
+                    histogram[2] += 1
+
+    def render(self, extra=()) -> str:
+        """
+        The registry in Prometheus text format. `extra` adds gauges read at
+        scrape time as (name, help, [(labels, value), ...]).
+        """
+        families: dict[str, list[str]] = {}
+        with self._lock:
+            for (name, labels), value in sorted(self._values.items()):
+                families.setdefault(name, []).append(f"{name}{_labels(labels)} {_number(value)}")
+            for (name, labels), (buckets, total, count) in sorted(self._histograms.items()):
+                lines = families.setdefault(name, [])
+                for bound, n in zip(BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {n}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+
+        out = []
+        for name, lines in families.items():
+            kind, help_text = METRICS.get(name, ("untyped", name))
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", *lines]
+        for name, help_text, samples in extra:
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            out += [f"{name}{_labels(tuple(sorted(labels.items())))} {_number(value)}" for labels, value in samples]
+        return "\n".join(out) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+# samples recorded in this process since the last drain()
+_buffer = []
+_buffer_lock = threading.Lock()
+
+
+def _record(kind, name, labels, value):
+    with _buffer_lock:
+        _buffer.append((kind, name, labels, value))
+
+
+def inc(name: str, value: float = 1, **labels):
+    _record("inc", name, labels, value)
+
+
+def set_gauge(name: str, value: float, **labels):
+    _record("set", name, labels, value)
+
+
+def observe(name: str, value: float, **labels):
+    _record("observe", name, labels, value)
+
+
+@contextmanager
+def timed(name: str = "tgt_stage_seconds", **labels):
+    """Observe how long the block takes (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def drain() -> list:
+    """Take this process's buffered samples, for REGISTRY.apply() here or in the API process."""
+    global _buffer
+    with _buffer_lock:
+        samples, _buffer = _buffer, []
+    return samples
+
+
+def rss_bytes(pid: int) -> int | None:
+    """Resident memory of a process, from /proc or psutil; None if unknown."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
@@ -0,0 +1,287 @@
+"""
+Local model artifact store.
+
+Every model the inference strategies need (spaCy pipelines, stanza resources,
+Hugging Face checkpoints) is fetched ahead of time into one directory together
+with a manifest.json holding a checksum and size per artifact. Strategies load
+strictly from the store and never download at job time; a missing artifact
+raises ModelNotAvailableError telling the operator to run the prefetch command:
+
+    python -m utils.model_store prefetch --all
+    python -m utils.model_store prefetch spacy de_dep_news_trf
+    python -m utils.model_store verify
+
+The store root defaults to backend/models and can be moved with TGT_MODEL_STORE.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = Path(__file__).resolve().parent.parent / "models"
+KINDS = ("spacy", "stanza", "hf")
+
+
+class ModelNotAvailableError(FileNotFoundError):
+    """Raised when a model is requested that has not been prefetched."""
+
+
+def checksum_tree(path: Path) -> tuple[str, int, int]:
+    """Return (sha256, total bytes, file count) over every file below `path`."""
+    digest = hashlib.sha256()
+    size = 0
+    count = 0
+    for file in sorted(p for p in path.rglob("*") if p.is_file()):
+        digest.update(file.relative_to(path).as_posix().encode("utf-8"))
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        size += file.stat().st_size
+        count += 1
+    return digest.hexdigest(), size, count
+
+
+def _tree_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class ModelStore:
+    def __init__(self, root: str | os.PathLike | None = None):
+        self.root = Path(root or os.getenv("TGT_MODEL_STORE") or DEFAULT_ROOT).resolve()
+        self.manifest_path = self.root / "manifest.json"
+        self.verify_on_load = os.getenv("TGT_VERIFY_MODELS") == "1"
+        self.load_times: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, name: str) -> str:
+        return f"{kind}:{name}"
+
+    def artifact_dir(self, kind: str, name: str) -> Path:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown model kind {kind!r}, expected one of {KINDS}")
+        return self.root / kind / name.replace("/", "__")
+
+    def read_manifest(self) -> dict:
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def resolve(self, kind: str, name: str) -> Path:
+        """
+        Return the local path of a prefetched artifact. The size recorded in
+        the manifest is always checked; the full checksum only when
+        TGT_VERIFY_MODELS=1 (or via `verify`).
+        """
+        entry = self.read_manifest().get(self.key(kind, name))
+        path = self.artifact_dir(kind, name)
+        if entry is None or not path.exists():
+            raise ModelNotAvailableError(
+                f"Model {kind}:{name} is not in the model store at {self.root}. "
+                f"Run `python -m utils.model_store prefetch {kind} {name}` first."
+            )
+        if self.verify_on_load:
+            self._check(entry, path)
+        elif _tree_size(path) != entry["size"]:
+            raise ModelNotAvailableError(
+                f"Model {kind}:{name} in {path} does not match its manifest entry; prefetch it again."
+            )
+        return path
+
+    def _check(self, entry: dict, path: Path):
+        sha256, _, _ = checksum_tree(path)
+        if sha256 != entry["sha256"]:
+            raise ModelNotAvailableError(
+                f"Checksum mismatch for {entry['kind']}:{entry['name']} in {path}; prefetch it again."
+            )
+
+    def verify(self, kind: str, name: str) -> bool:
+        entry = self.read_manifest().get(self.key(kind, name))
+        if entry is None:
+            return False
+        try:
+            self._check(entry, self.artifact_dir(kind, name))
+        except ModelNotAvailableError:
+            return False
+        return True
+
+    def record_load(self, kind: str, name: str, seconds: float):
+        key = self.key(kind, name)
+        with self._lock:
+            self.load_times.setdefault(key, []).append(seconds)
+        logger.info(f"Loaded {key} in {seconds:.2f}s")
+        try:
+            with open(self.root / "load_times.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "model": key,
+                    "seconds": round(seconds, 3),
+                    "pid": os.getpid(),
+                    "at": datetime.now(timezone.utc).isoformat(),
+                }) + "\n")
+        except OSError:
+            # read-only stores are fine; the in-process record is kept anyway
+            pass
+
+    def prefetch(self, kind: str, name: str, force: bool = False) -> dict:
+        """Fetch one artifact into the store and record it in the manifest."""
+        key = self.key(kind, name)
+        dest = self.artifact_dir(kind, name)
+        manifest = self.read_manifest()
+        if key in manifest and dest.exists() and not force:
+            print(f"{key} already in store")
+            return manifest[key]
+
+        if dest.exists():
+            shutil.rmtree(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        print(f"Fetching {key} into {dest}…", flush=True)
+        if kind == "spacy":
+            import spacy
+            from spacy.cli import download
+            from spacy.util import is_package
+            if not is_package(name):
+                download(name)
+            spacy.load(name).to_disk(dest)
+        elif kind == "stanza":
+            import stanza
+            stanza.download(name, model_dir=str(dest))
+        elif kind == "hf":
+            from huggingface_hub import snapshot_download
+            snapshot_download(repo_id=name, local_dir=str(dest), token=os.getenv("HUGGING_KEY"))
+
+        sha256, size, count = checksum_tree(dest)
+        entry = {
+            "kind": kind,
+            "name": name,
+            "path": dest.relative_to(self.root).as_posix(),
+            "sha256": sha256,
+            "size": size,
+            "files": count,
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with self._lock:
+            manifest = self.read_manifest()
+            manifest[key] = entry
+            self._write_manifest(manifest)
+        print(f"Stored {key} ({size / 1e6:.1f} MB, {count} files)")
+        return entry
+
+
+@lru_cache(maxsize=None)
+def get_model_store() -> ModelStore:
+    return ModelStore()
+
+
+def _timed(kind: str, name: str, loader):
+    store = get_model_store()
+    path = store.resolve(kind, name)
+    start = time.perf_counter()
+    model = loader(path)
+    store.record_load(kind, name, time.perf_counter() - start)
+    return model
+
+
+def load_spacy(name: str, **kwargs):
+    """Load a spaCy pipeline from the store (kwargs go to spacy.load)."""
+    import spacy
+    return _timed("spacy", name, lambda path: spacy.load(path, **kwargs))
+
+
+def load_stanza_pipeline(language_code: str, **kwargs):
+    """Load a spacy_stanza pipeline from the store without touching the network."""
+    import spacy_stanza
+    return _timed(
+        "stanza",
+        language_code,
+        lambda path: spacy_stanza.load_pipeline(language_code, dir=str(path), download_method=None, **kwargs),
+    )
+
+
+def load_hf(name: str, loader):
+    """Load a Hugging Face artifact from the store; `loader` receives the local path."""
+    return _timed("hf", name, loader)
+
+
+def catalogue() -> list[tuple[str, str]]:
+    """Every artifact the shipped strategies can ask for."""
+    from inference.glossing.default import MODELS
+    from inference.translation.factory import MARIAN_LANGUAGES
+
+    items = []
+    for models in MODELS.values():
+        items += [("spacy", name) for name in models.values()]
+    items += [("spacy", "pt_core_news_lg"), ("spacy", "ja_core_news_trf"), ("stanza", "vi")]
+    items += [("hf", f"Helsinki-NLP/opus-mt-{code}-en") for code in MARIAN_LANGUAGES]
+    items += [("hf", "meta-llama/Llama-3.2-1B"), ("hf", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")]
+    return list(dict.fromkeys(items))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local model artifact store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    fetch = sub.add_parser("prefetch", help="download artifacts into the store")
+    fetch.add_argument("kind", nargs="?", choices=KINDS)
+    fetch.add_argument("name", nargs="?")
+    fetch.add_argument("--all", action="store_true", help="fetch every artifact in the catalogue")
+    fetch.add_argument("--force", action="store_true", help="fetch again even if already stored")
+
+    sub.add_parser("verify", help="re-hash every stored artifact")
+    sub.add_parser("list", help="list stored artifacts")
+
+    args = parser.parse_args()
+    store = get_model_store()
+
+    if args.command == "prefetch":
+        if args.all:
+            items = catalogue()
+        elif args.kind and args.name:
+            items = [(args.kind, args.name)]
+        else:
+            parser.error("give KIND NAME or --all")
+        failed = []
+        for kind, name in items:
+            try:
+                store.prefetch(kind, name, force=args.force)
+            except Exception as e:
+                print(f"Failed to fetch {kind}:{name}: {e}")
+                failed.append(f"{kind}:{name}")
+        if failed:
+            print(f"{len(failed)} artifact(s) failed: {', '.join(failed)}")
+            sys.exit(1)
+
+    elif args.command == "verify":
+        bad = [key for key, entry in store.read_manifest().items()
+               if not store.verify(entry["kind"], entry["name"])]
+        for key in bad:
+            print(f"FAILED {key}")
+        print(f"{len(bad)} of {len(store.read_manifest())} artifact(s) failed verification")
+        sys.exit(1 if bad else 0)
+
+    elif args.command == "list":
+        for key, entry in sorted(store.read_manifest().items()):
+            print(f"{key:60} {entry['size'] / 1e6:10.1f} MB  {entry['sha256'][:12]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,14 @@ import tempfile
 import requests
 import base64
 
+from utils.progress import ProgressTracker
+from utils.metrics import timed
+
 def encode_share_link(link):
     encoded_url = base64.urlsafe_b64encode(link.encode()).decode().rstrip("=")
     return f"u!{encoded_url}"
 
-def download_sharepoint_folder(share_link, temp_dir, access_token):
+def download_sharepoint_folder(share_link, temp_dir, access_token, progress=None):
     headers = {"Authorization": f"Bearer {access_token}"}
     share_id = encode_share_link(share_link)
     root_url = f"https://graph.microsoft.com/v1.0/shares/{share_id}/driveItem"
@@ -19,6 +22,7 @@ def download_sharepoint_folder(share_link, temp_dir, access_token):
     drive_id = root_item['parentReference']['driveId']
     parent_folder_id = root_item['id']
     session_folder_id_map = {}
+    downloads = []
 
     def recursive_collect_files(item, relative_path):
         if "folder" in item:
@@ -48,17 +52,47 @@ def download_sharepoint_folder(share_link, temp_dir, access_token):
 
             download_url = item.get("@microsoft.graph.downloadUrl")
             if download_url:
-                r = requests.get(download_url, stream=True)
-                r.raise_for_status()
-                with open(file_path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                downloads.append((download_url, file_path, item.get('size', 0)))
 
+    # list the whole tree first so progress has file and byte totals
     recursive_collect_files(root_item, relative_path="")
+
+    tracker = ProgressTracker(progress, "download", total=len(downloads), unit="files",
+                              bytes_total=sum(size for _, _, size in downloads) or None)
+    for download_url, file_path, _ in downloads:
+        with timed(stage="onedrive_download"):
+            r = requests.get(download_url, stream=True)
+            r.raise_for_status()
+            with open(file_path, 'wb') as f:
+                for chunk in r.iter_content(chunk_size=8192):
+                    f.write(chunk)
+                    tracker.advance(0, len(chunk))
+        tracker.advance()
     return temp_dir, drive_id, parent_folder_id, session_folder_id_map
 
 
-def upload_file_replace_in_onedrive(local_file_path, target_drive_id, parent_folder_id, file_name_in_folder, access_token):
+class _ProgressReader:
+    """File wrapper that requests streams with a Content-Length, reporting bytes read."""
+
+    def __init__(self, f, tracker):
+        self.f = f
+        self.tracker = tracker
+        self.size = os.fstat(f.fileno()).st_size
+
+    def __len__(self):
+        return self.size
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.tracker.advance(0, len(data))
+        return data
+
+    def __iter__(self):
+        return iter(lambda: self.read(8192), b"")
+
+
+def upload_file_replace_in_onedrive(local_file_path, target_drive_id, parent_folder_id, file_name_in_folder, access_token,
+                                    progress=None):
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/octet-stream"
@@ -67,7 +101,11 @@ def upload_file_replace_in_onedrive(local_file_path, target_drive_id, parent_fol
     upload_url = f"https://graph.microsoft.com/v1.0/drives/{target_drive_id}/items/{parent_folder_id}:/{file_name_in_folder}:/content"
 
     with open(local_file_path, 'rb') as f:
-        response = requests.put(upload_url, headers=headers, data=f)
+        tracker = ProgressTracker(progress, "upload", total=1, unit="files",
+                                  bytes_total=os.fstat(f.fileno()).st_size or None)
+        with timed(stage="onedrive_upload"):
+            response = requests.put(upload_url, headers=headers, data=_ProgressReader(f, tracker))
+        tracker.advance()
 
     if response.status_code not in (200, 201):
         raise Exception(f"Failed to upload/replace file: {response.text}")
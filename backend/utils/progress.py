@@ -0,0 +1,162 @@
+"""
+Typed job progress events.
+
+Everything a job reports travels as a ProgressEvent: from the processing
+classes and OneDrive helpers (through their optional `progress` callback) to
+the worker, over the pool's result queue into the job store's event log, and
+out of /jobs/{id}/stream as one JSON object per SSE event, e.g.
+
+    {"type": "progress", "stage": "gloss", "session": "Session_3", "index": 512,
+     "total": 2048, "unit": "lines", "rate": 85.3, "eta": 18.0, "at": 1760000000.0}
+
+`type` is one of EVENT_TYPES; a job's last event is always {"type": "done"}.
+When the pool finishes a job, that event carries the final status as
+{"data": {"status": ...}}: "done" (also when only some sessions failed),
+"failed" or "cancelled".
+`unit` names what index/total count; `rate` is in those units per second,
+except for transfers with a known `bytes_total`, where it is bytes per second.
+"""
+
+import json
+import time
+from dataclasses import dataclass, field, asdict, replace
+from typing import Callable, Optional
+
+from utils import metrics
+
+EVENT_TYPES = ("log", "progress", "queued", "started", "results", "uploaded", "cancelled", "error", "done")
+
+# legacy string messages and the event type they map to
+_PREFIXES = {
+    "[ERROR]": "error",
+    "[CANCELLED]": "cancelled",
+    "[DONE ALL]": "done",
+    "[DONE UPLOADED]": "uploaded",
+}
+
+
+@dataclass
+class ProgressEvent:
+    type: str = "log"
+    message: str | None = None
+    stage: str | None = None
+    session: str | None = None
+    index: int | None = None
+    total: int | None = None
+    unit: str | None = None
+    rate: float | None = None
+    eta: float | None = None
+    bytes: int | None = None
+    bytes_total: int | None = None
+    data: object = None
+    at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        if self.type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type {self.type!r}, expected one of {EVENT_TYPES}")
+
+    def to_dict(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> "ProgressEvent":
+        try:
+            return cls(**json.loads(text))
+        except (ValueError, TypeError):
+            return cls.coerce(text)
+
+    @classmethod
+    def coerce(cls, value) -> "ProgressEvent":
+        """Accept an event, its dict form, or a plain (legacy) message string."""
+        if isinstance(value, ProgressEvent):
+            return value
+        if isinstance(value, dict):
+            return cls(**value)
+        text = str(value)
+        for prefix, kind in _PREFIXES.items():
+            if text.startswith(prefix):
+                rest = text[len(prefix):].strip() or None
+                if kind == "uploaded":
+                    return cls("uploaded", session=rest)
+                return cls(kind, message=rest)
+        return cls("log", message=text)
+
+    def with_session(self, session: str | None) -> "ProgressEvent":
+        return self if self.session else replace(self, session=session)
+
+
+Reporter = Optional[Callable[[ProgressEvent], None]]
+
+
+def is_final(text: str) -> bool:
+    """Whether a stored event is the job's closing "done" event."""
+    return ProgressEvent.from_json(text).type == "done"
+
+
+class ProgressTracker:
+    """
+    Counts the items of one stage and reports progress with throughput and
+    ETA, at most every `interval` seconds (plus the final update). When
+    `bytes_total` is given, rate and ETA are measured in bytes.
+    """
+
+    def __init__(self, report: Reporter, stage: str, total: int | None = None, unit: str = "items",
+                 bytes_total: int | None = None, session: str | None = None, interval: float = 0.5):
+        self.report = report
+        self.stage = stage
+        self.total = total
+        self.unit = unit
+        self.bytes_total = bytes_total
+        self.session = session
+        self.interval = interval
+        self.done = 0
+        self.bytes = 0
+        self.start = time.monotonic()
+        self._last_report = 0.0
+
+    def advance(self, n: int = 1, nbytes: int = 0):
+        self.done += n
+        self.bytes += nbytes
+        if n:
+            metrics.inc("tgt_items_total", n, stage=self.stage, unit=self.unit)
+        if nbytes:
+            metrics.inc("tgt_transfer_bytes_total", nbytes, stage=self.stage)
+        now = time.monotonic()
+        finished = self.total is not None and self.done >= self.total
+        if finished or now - self._last_report >= self.interval:
+            self._last_report = now
+            self._emit(now)
+
+    def finish(self):
+        self._emit(time.monotonic())
+
+    def event(self, now: float | None = None) -> ProgressEvent:
+        elapsed = max((now or time.monotonic()) - self.start, 1e-9)
+        if self.bytes_total:
+            rate = self.bytes / elapsed
+            remaining = self.bytes_total - self.bytes
+        else:
+            rate = self.done / elapsed
+            remaining = None if self.total is None else self.total - self.done
+        eta = remaining / rate if remaining is not None and rate > 0 else None
+        return ProgressEvent(
+            "progress",
+            stage=self.stage,
+            session=self.session,
+            index=self.done,
+            total=self.total,
+            unit=self.unit,
+            rate=round(rate, 2),
+            eta=None if eta is None else round(eta, 1),
+            bytes=self.bytes or None,
+            bytes_total=self.bytes_total,
+        )
+
+    def _emit(self, now):
+        elapsed = max(now - self.start, 1e-9)
+        metrics.set_gauge("tgt_items_per_second", round(self.done / elapsed, 2), stage=self.stage, unit=self.unit)
+        if self.report is not None:
+            self.report(self.event(now))
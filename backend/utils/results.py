@@ -0,0 +1,98 @@
+"""
+Job results and their streamed ZIP download.
+
+The offline worker reports which result files a job produced
+(collect_results); /jobs/{id}/download then builds the archive on the fly
+while sending it (stream_zip), so it is never written to disk or held in
+memory. A manifest.json listing every included file with its size and
+sha256 is appended as the last member.
+"""
+
+import io
+import os
+import json
+import time
+import hashlib
+import zipfile
+from pathlib import Path
+
+RESULT_FILES = ("trials_and_sessions_annotated.xlsx", "transcription.log", "translation.log")
+COMPRESSIONS = ("auto", "deflate", "store")
+# formats that are compressed already; "auto" stores them as they are
+COMPRESSED_SUFFIXES = {".xlsx", ".zip", ".gz", ".mp3", ".mp4", ".m4a", ".ogg", ".flac", ".jpg", ".png"}
+CHUNK_SIZE = 1 << 20
+
+
+def collect_results(base_dir) -> list[str]:
+    """Result files below `base_dir`, as sorted posix paths relative to it."""
+    found = []
+    for root, _, files in os.walk(base_dir):
+        for file in files:
+            if file in RESULT_FILES:
+                found.append(Path(os.path.relpath(os.path.join(root, file), base_dir)).as_posix())
+    return sorted(found)
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, unseekable target that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def _compress_type(path: Path, compression: str) -> int:
+    if compression == "store" or (compression == "auto" and path.suffix.lower() in COMPRESSED_SUFFIXES):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def stream_zip(base_dir, files, compression="auto"):
+    """Yield a ZIP archive of `files` (relative to `base_dir`) chunk by chunk."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {COMPRESSIONS}")
+    base = Path(base_dir)
+    sink = _Sink()
+    manifest = []
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for name in files:
+            path = base / name
+            if not path.is_file():
+                continue
+            info = zipfile.ZipInfo.from_file(path, name)
+            info.compress_type = _compress_type(path, compression)
+            digest = hashlib.sha256()
+            with open(path, "rb") as src, archive.open(info, "w") as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+                    yield from sink.drain()
+            manifest.append({
+                "path": name,
+                "size": info.file_size,
+                "sha256": digest.hexdigest(),
+                "stored": info.compress_type == zipfile.ZIP_STORED,
+            })
+            yield from sink.drain()
+
+        archive.writestr(
+            "manifest.json",
+            json.dumps({"created_at": time.time(), "files": manifest}, indent=2),
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+    yield from sink.drain()
@@ -0,0 +1,431 @@
+"""
+Streaming upload handling for /jobs/process.
+
+The multipart body is parsed as it arrives (FormStream) and the uploaded ZIP
+is extracted member by member from the raw stream (ZipStreamExtractor), so
+neither the archive nor a member is ever held in memory as a whole and
+extraction overlaps with the upload.
+
+Progress is published to the worker through marker files in the extraction
+directory:
+
+    <Session_x>/.tgt_session_ready   written once every member of the session
+                                     landed; holds a generation counter that is
+                                     bumped if the session is ever reopened
+    .tgt_upload_complete             written when the whole archive is extracted
+    .tgt_upload_failed               written (with the reason) if the upload broke
+
+Archives list a folder's files together, so a session is complete as soon as
+a member of the next one arrives. Members that cannot be streamed (stored with
+a trailing data descriptor, compression other than deflate) switch the
+extractor to extracting from the spooled archive once the upload finishes.
+"""
+
+import os
+import time
+import zlib
+import shutil
+import struct
+import zipfile
+from pathlib import Path, PurePosixPath
+from urllib.parse import parse_qsl
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+READY_MARKER = ".tgt_session_ready"
+UPLOAD_COMPLETE = ".tgt_upload_complete"
+UPLOAD_FAILED = ".tgt_upload_failed"
+
+MAX_UPLOAD_BYTES = int(os.getenv("TGT_MAX_UPLOAD_MB", "20000")) * 2**20
+MAX_EXTRACT_BYTES = int(os.getenv("TGT_MAX_EXTRACT_MB", "40000")) * 2**20
+MAX_MEMBERS = int(os.getenv("TGT_MAX_ZIP_MEMBERS", "100000"))
+# plain form fields (and part headers) are held in memory
+MAX_FIELD_BYTES = int(os.getenv("TGT_MAX_FIELD_KB", "64")) * 2**10
+MAX_FIELDS = 32
+
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+LOCAL_SIG, CENTRAL_SIG, END_SIG, DESCRIPTOR_SIG = 0x04034B50, 0x02014B50, 0x06054B50, 0x08074B50
+ZIP64_EXTRA = 0x0001
+
+
+class UploadRejected(ValueError):
+    """The upload is not an acceptable archive."""
+
+
+class UploadTooLarge(UploadRejected):
+    """The upload broke a size or member-count limit."""
+
+
+def safe_member_path(dest: Path, name: str) -> Path | None:
+    """Where a member is extracted to; rejects absolute paths and `..` (zip slip)."""
+    parts = PurePosixPath(name.replace("\\", "/")).parts
+    if not parts or parts[0] == "/" or ":" in parts[0] or ".." in parts:
+        raise UploadRejected(f"Unsafe path in archive: {name!r}")
+    if parts[0] == "__MACOSX":
+        return None
+    return dest.joinpath(*parts)
+
+
+def session_of(dest: Path, path: Path) -> Path | None:
+    """The (outermost) Session_* folder a file belongs to, if any."""
+    for parent in reversed(path.relative_to(dest).parents):
+        if parent.name.startswith("Session_"):
+            return dest / parent
+    return None
+
+
+class ZipStreamExtractor:
+    """Extract a ZIP archive from a byte stream while it is still arriving."""
+
+    def __init__(self, dest, max_bytes=MAX_EXTRACT_BYTES, max_members=MAX_MEMBERS, max_upload=MAX_UPLOAD_BYTES):
+        self.dest = Path(dest)
+        self.max_bytes = max_bytes
+        self.max_members = max_members
+        self.max_upload = max_upload
+        # the raw archive is spooled to disk too, for members we cannot stream
+        self.raw_path = self.dest / ".upload.zip"
+        self._raw = open(self.raw_path, "wb")
+        self.received = 0
+        self.extracted = 0
+        self.members: set[str] = set()
+        self._buffer = bytearray()
+        self._state = "header"
+        self._member = None
+        self._session = None
+        self._generations: dict[Path, int] = {}
+
+    # -- stream parsing ---------------------------------------------------
+
+    def feed(self, data: bytes):
+        self.received += len(data)
+        if self.received > self.max_upload:
+            raise UploadTooLarge(f"Upload exceeds {self.max_upload // 2**20} MB")
+        self._raw.write(data)
+        if self._state in ("fallback", "done"):
+            return
+        self._buffer += data
+        while self._step():
+            pass
+
+    def _step(self) -> bool:
+        """Consume as much of the buffer as possible; False when more input is needed."""
+        if self._state == "header":
+            return self._read_header()
+        if self._state == "data":
+            return self._read_data()
+        if self._state == "descriptor":
+            return self._read_descriptor()
+        return False
+
+    def _read_header(self) -> bool:
+        if len(self._buffer) < 4:
+            return False
+        signature = struct.unpack_from("<I", self._buffer)[0]
+        if signature in (CENTRAL_SIG, END_SIG):
+            # central directory: every member has been seen
+            self._state = "done"
+            self._buffer.clear()
+            return False
+        if signature != LOCAL_SIG:
+            raise UploadRejected("Upload is not a ZIP archive")
+        if len(self._buffer) < LOCAL_HEADER.size:
+            return False
+        (_, _, flags, method, _, _, crc, csize, usize, name_len, extra_len) = LOCAL_HEADER.unpack_from(self._buffer)
+        end = LOCAL_HEADER.size + name_len + extra_len
+        if len(self._buffer) < end:
+            return False
+
+        raw_name = bytes(self._buffer[LOCAL_HEADER.size:LOCAL_HEADER.size + name_len])
+        name = raw_name.decode("utf-8" if flags & 0x800 else "cp437")
+        extra = bytes(self._buffer[LOCAL_HEADER.size + name_len:end])
+        del self._buffer[:end]
+
+        zip64 = False
+        offset = 0
+        while offset + 4 <= len(extra):
+            header_id, size = struct.unpack_from("<HH", extra, offset)
+            if header_id == ZIP64_EXTRA and size >= 16:
+                usize, csize = struct.unpack_from("<QQ", extra, offset + 4)
+                zip64 = True
+            offset += 4 + size
+
+        if flags & 0x1:
+            raise UploadRejected("Encrypted archives are not supported")
+        has_descriptor = bool(flags & 0x8)
+        if method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) or (has_descriptor and method == zipfile.ZIP_STORED):
+            # size unknown or codec not streamable: finish from the spooled archive
+            self._state = "fallback"
+            self._buffer.clear()
+            return False
+
+        if len(self.members) >= self.max_members:
+            raise UploadTooLarge(f"Archive has more than {self.max_members} members")
+        path = safe_member_path(self.dest, name)
+        self.members.add(name)
+        self._member = {
+            "name": name,
+            "path": path,
+            "file": None,
+            "method": method,
+            "crc": crc,
+            "remaining": None if has_descriptor else csize,
+            "descriptor": has_descriptor,
+            "zip64": zip64,
+            "running_crc": 0,
+            "inflate": zlib.decompressobj(-15) if method == zipfile.ZIP_DEFLATED else None,
+        }
+        if path is not None:
+            if name.endswith("/"):
+                path.mkdir(parents=True, exist_ok=True)
+            else:
+                self._enter(path)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._member["file"] = open(path.with_name(path.name + ".part"), "wb")
+        self._state = "data"
+        return True
+
+    def _read_data(self) -> bool:
+        member = self._member
+        if not self._buffer and member["remaining"] != 0:
+            return False
+        if member["remaining"] is None:
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            chunk = bytes(self._buffer[:member["remaining"]])
+            del self._buffer[:len(chunk)]
+            member["remaining"] -= len(chunk)
+
+        if member["inflate"] is not None:
+            self._write(member["inflate"].decompress(chunk))
+            if member["inflate"].eof:
+                # anything past the end of the deflate stream belongs to the next record
+                self._buffer[:0] = member["inflate"].unused_data
+                member["remaining"] = 0
+        else:
+            self._write(chunk)
+
+        if member["remaining"] != 0:
+            return bool(self._buffer)
+        if member["descriptor"]:
+            self._state = "descriptor"
+        else:
+            self._close_member(member["crc"])
+        return True
+
+    def _read_descriptor(self) -> bool:
+        size = 20 if self._member["zip64"] else 12
+        if len(self._buffer) < 4:
+            return False
+        has_signature = struct.unpack_from("<I", self._buffer)[0] == DESCRIPTOR_SIG
+        needed = size + (4 if has_signature else 0)
+        if len(self._buffer) < needed:
+            return False
+        crc = struct.unpack_from("<I", self._buffer, 4 if has_signature else 0)[0]
+        del self._buffer[:needed]
+        self._close_member(crc)
+        return True
+
+    def _write(self, data: bytes):
+        if not data:
+            return
+        self.extracted += len(data)
+        if self.extracted > self.max_bytes:
+            raise UploadTooLarge(f"Archive expands to more than {self.max_bytes // 2**20} MB")
+        self._member["running_crc"] = zlib.crc32(data, self._member["running_crc"])
+        if self._member["file"] is not None:
+            self._member["file"].write(data)
+
+    def _close_member(self, crc: int):
+        member = self._member
+        if member["running_crc"] != crc:
+            raise UploadRejected(f"CRC mismatch for {member['name']!r}")
+        if member["file"] is not None:
+            member["file"].close()
+            os.replace(member["file"].name, member["path"])
+        self._member = None
+        self._state = "header"
+
+    # -- session bookkeeping ---------------------------------------------
+
+    def _enter(self, path: Path):
+        session = session_of(self.dest, path)
+        if session == self._session:
+            return
+        if self._session is not None:
+            self._mark_ready(self._session)
+        self._session = session
+        if session is not None and session in self._generations:
+            # the archive came back to a finished session; it is marked again when complete
+            (session / READY_MARKER).unlink(missing_ok=True)
+
+    def _mark_ready(self, session: Path):
+        self._generations[session] = self._generations.get(session, 0) + 1
+        tmp = session / (READY_MARKER + ".tmp")
+        tmp.write_text(str(self._generations[session]))
+        os.replace(tmp, session / READY_MARKER)
+
+    # -- completion -------------------------------------------------------
+
+    def finish(self):
+        """The upload is complete: extract what could not be streamed and publish the markers."""
+        self._raw.close()
+        if self._state == "fallback":
+            self._extract_remaining()
+        elif self._state not in ("header", "done"):
+            raise UploadRejected("Upload ended in the middle of an archive member")
+
+        if self._session is not None:
+            self._mark_ready(self._session)
+            self._session = None
+        self.raw_path.unlink(missing_ok=True)
+        (self.dest / UPLOAD_COMPLETE).write_text(str(time.time()))
+
+    def _extract_remaining(self):
+        try:
+            archive = zipfile.ZipFile(self.raw_path)
+        except zipfile.BadZipFile as e:
+            raise UploadRejected(str(e))
+        with archive:
+            infos = archive.infolist()
+            if len(infos) > self.max_members:
+                raise UploadTooLarge(f"Archive has more than {self.max_members} members")
+            for info in infos:
+                if info.filename in self.members:
+                    continue
+                path = safe_member_path(self.dest, info.filename)
+                if path is None:
+                    continue
+                if info.is_dir():
+                    path.mkdir(parents=True, exist_ok=True)
+                    continue
+                self._enter(path)
+                self.extracted += info.file_size
+                if self.extracted > self.max_bytes:
+                    raise UploadTooLarge(f"Archive expands to more than {self.max_bytes // 2**20} MB")
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with archive.open(info) as src, open(path, "wb") as out:
+                    shutil.copyfileobj(src, out, 1 << 20)
+
+    def fail(self, reason: str):
+        if self._member and self._member["file"] is not None:
+            self._member["file"].close()
+        self._raw.close()
+        self.raw_path.unlink(missing_ok=True)
+        (self.dest / UPLOAD_FAILED).write_text(reason)
+
+
+class FormStream:
+    """
+    Parse a multipart/form-data request as it arrives. Plain fields are
+    collected into `fields` (UTF-8, at most `max_field` bytes each); the bytes
+    of the file field are passed to the sink returned by
+    `open_file(fields, filename)` (called once the file part starts, so every
+    field sent before it is known). Any other file part is rejected.
+    """
+
+    def __init__(self, request, file_field: str, open_file, max_field: int = MAX_FIELD_BYTES):
+        self.request = request
+        self.file_field = file_field
+        self.open_file = open_file
+        self.max_field = max_field
+        self.fields: dict[str, str] = {}
+        self.sink = None
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name = None
+        self._filename = None
+        self._value = bytearray()
+
+    async def parse(self) -> dict:
+        from starlette.concurrency import run_in_threadpool
+
+        content_type, params = parse_options_header(self.request.headers.get("content-type", ""))
+        if content_type == b"application/x-www-form-urlencoded":
+            # no file can be in it; bounded like the plain fields of a multipart body
+            body = bytearray()
+            async for chunk in self.request.stream():
+                body += chunk
+                if len(body) > self.max_field * MAX_FIELDS:
+                    raise UploadTooLarge(f"Form body exceeds {self.max_field * MAX_FIELDS} bytes")
+            try:
+                self.fields = dict(parse_qsl(body.decode("utf-8", errors="strict"), keep_blank_values=True))
+            except UnicodeDecodeError:
+                raise UploadRejected("Form body is not valid UTF-8")
+            return self.fields
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise UploadRejected("Expected a multipart/form-data body")
+        parser = multipart.MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": lambda data, start, end: self._add(data, start, end, "_header_field"),
+            "on_header_value": lambda data, start, end: self._add(data, start, end, "_header_value"),
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        try:
+            async for chunk in self.request.stream():
+                if chunk:
+                    # extraction does disk IO and inflating; keep it off the event loop
+                    await run_in_threadpool(parser.write, chunk)
+            parser.finalize()
+            if self.sink is not None:
+                await run_in_threadpool(self.sink.finish)
+        except BaseException as e:
+            if self.sink is not None:
+                self.sink.fail(str(e) or type(e).__name__)
+            raise
+        return self.fields
+
+    def _add(self, data, start, end, attr):
+        value = getattr(self, attr) + data[start:end]
+        if len(value) > self.max_field:
+            raise UploadTooLarge(f"Part header exceeds {self.max_field} bytes")
+        setattr(self, attr, value)
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._name = self._filename = None
+        self._value = bytearray()
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        filename = options.get(b"filename")
+        self._filename = filename.decode("utf-8", errors="replace") if filename is not None else None
+        if self._filename is None:
+            return
+        if self._name != self.file_field:
+            raise UploadRejected(f"Unexpected file in form field {self._name!r}, expected {self.file_field!r}")
+        if self.sink is not None:
+            raise UploadRejected(f"Only one {self.file_field!r} file may be uploaded")
+        self.sink = self.open_file(self.fields, self._filename)
+
+    def _on_part_data(self, data, start, end):
+        if self._filename is not None:
+            self.sink.feed(data[start:end])
+            return
+        if len(self._value) + end - start > self.max_field:
+            raise UploadTooLarge(f"Form field {self._name!r} exceeds {self.max_field} bytes")
+        self._value += data[start:end]
+
+    def _on_part_end(self):
+        if self._filename is not None:
+            return
+        if len(self.fields) >= MAX_FIELDS:
+            raise UploadTooLarge(f"Form has more than {MAX_FIELDS} fields")
+        try:
+            self.fields[self._name] = self._value.decode("utf-8", errors="strict")
+        except UnicodeDecodeError:
+            raise UploadRejected(f"Form field {self._name!r} is not valid UTF-8")
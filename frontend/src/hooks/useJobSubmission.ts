@@ -31,7 +31,13 @@ export function useJobSubmission(
     addLog("Submitting job…", "info");
 
     const form = new FormData();
-    form.append("action", action);
+    // a comma-separated action runs its steps in one pipeline job
+    if (action.includes(",")) {
+      form.append("action", "pipeline");
+      form.append("stages", action);
+    } else {
+      form.append("action", action);
+    }
     form.append("instruction", instruction);
     form.append("language", language);
 
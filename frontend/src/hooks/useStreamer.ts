@@ -6,11 +6,55 @@ type LogType = "info" | "success" | "error" | "warning";
 // Storage keys
 const JOB_KEY = "job_id";
 
+// One job event as sent by /jobs/{id}/stream (backend/utils/progress.py)
+export interface ProgressEvent {
+  type: "log" | "progress" | "queued" | "started" | "results" | "uploaded" | "cancelled" | "error" | "done";
+  message?: string;
+  stage?: string;
+  session?: string;
+  index?: number;
+  total?: number;
+  unit?: string;
+  rate?: number;
+  eta?: number;
+  bytes?: number;
+  bytes_total?: number;
+  data?: unknown;
+  at: number;
+}
+
+const formatBytes = (n: number) => {
+  const units = ["B", "KB", "MB", "GB"];
+  let i = 0;
+  while (n >= 1024 && i < units.length - 1) {
+    n /= 1024;
+    i++;
+  }
+  return `${n.toFixed(i ? 1 : 0)} ${units[i]}`;
+};
+
+const formatProgress = (ev: ProgressEvent) => {
+  const where = ev.session ? ` ${ev.session}` : "";
+  const count = ev.total != null ? `${ev.index}/${ev.total}` : `${ev.index ?? 0}`;
+  let line = `[${ev.stage}]${where}: ${count} ${ev.unit ?? ""}`.trimEnd();
+  if (ev.bytes_total) {
+    line += ` (${formatBytes(ev.bytes ?? 0)} of ${formatBytes(ev.bytes_total)}`;
+    if (ev.rate) line += `, ${formatBytes(ev.rate)}/s`;
+    line += ")";
+  } else if (ev.rate) {
+    line += ` (${ev.rate.toFixed(1)} ${ev.unit ?? "items"}/s)`;
+  }
+  if (ev.eta != null) line += `, ETA ${Math.round(ev.eta)}s`;
+  return line;
+};
+
 export function useStreamer(
   addLog: (msg: string, type?: LogType) => void,
   setIsProcessing: (v: boolean) => void,
 ) {
   const evtRef = useRef<EventSource | null>(null);
+  const failedRef = useRef(false);
+  const partialRef = useRef(false);
 
   const finish = () => {
     evtRef.current?.close();
@@ -23,21 +67,57 @@ export function useStreamer(
     localStorage.setItem(JOB_KEY, jobId);
     addLog(`Opened job ${jobId}`, "info");
     setIsProcessing(true);
+    failedRef.current = false;
+    partialRef.current = false;
 
     const evt = new EventSource(`/jobs/${jobId}/stream`);
     evtRef.current = evt;
 
     evt.onmessage = (e) => {
-      const data = e.data;
-      if (data === "[PING]") return;
-      if (data.includes("[ERROR]")) {
-        addLog(data, "error");
-        finish();
-      } else if (data.includes("[DONE ALL]")) {
-        addLog("Workflow completed successfully!", "success");
-        finish();
-      } else {
-        addLog(data, "info");
+      let ev: ProgressEvent;
+      try {
+        ev = JSON.parse(e.data);
+      } catch {
+        addLog(e.data, "info");
+        return;
+      }
+      switch (ev.type) {
+        case "error":
+          // an error of one session leaves the other sessions running
+          if (ev.session) partialRef.current = true;
+          else failedRef.current = true;
+          addLog(ev.session ? `${ev.session}: ${ev.message}` : ev.message ?? "Job failed", "error");
+          break;
+        case "cancelled":
+          failedRef.current = true;
+          addLog("Cancelled", "warning");
+          break;
+        case "done": {
+          // the job's final status decides; events stored without one fall back to the errors seen
+          const status = (ev.data as { status?: string } | undefined)?.status;
+          const failed = status ? status !== "done" : failedRef.current;
+          if (status === "failed") {
+            addLog("Workflow failed", "error");
+          } else if (failed) {
+            // cancelled or interrupted: already reported
+          } else if (partialRef.current) {
+            addLog("Workflow completed, but some sessions failed", "warning");
+          } else {
+            addLog("Workflow completed successfully!", "success");
+          }
+          finish();
+          break;
+        }
+        case "progress":
+          addLog(formatProgress(ev), "info");
+          break;
+        case "uploaded":
+          addLog(`Uploaded results for ${ev.session}`, "success");
+          break;
+        case "results":
+          break;
+        default:
+          addLog(ev.message ?? ev.type, "info");
       }
     };
   };
@@ -256,6 +256,10 @@ export default function Inference() {
                     <SelectItem value="translate">Translate</SelectItem>
                     <SelectItem value="gloss">Gloss</SelectItem>
                     <SelectItem value="transliterate">Transliterate</SelectItem>
+                    <SelectItem value="select">Select sentences</SelectItem>
+                    <SelectItem value="transcribe,translate,gloss">
+                      Transcribe → Translate → Gloss
+                    </SelectItem>
                   </SelectContent>
                 </Select>
               </div>